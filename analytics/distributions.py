@@ -0,0 +1,73 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import pytz
+
+def _load(out_dir: str, columns):
+    """Read host columns from an export as ``(format, data)``, preferring Parquet."""
+    parquet_path = os.path.join(out_dir, "hosts.parquet")
+    if os.path.exists(parquet_path):
+        import pyarrow.parquet as pq
+        return "parquet", pq.read_table(parquet_path, columns=list(columns))
+    npz_path = os.path.join(out_dir, "hosts.npz")
+    if os.path.exists(npz_path):
+        import numpy as np
+        return "npz", np.load(npz_path)
+    raise FileNotFoundError(f"No hosts.parquet or hosts.npz in {out_dir}")
+
+def _value_counts(kind: str, data: Any, column: str) -> Dict[Optional[str], int]:
+    if kind == "parquet":
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        counts = pc.value_counts(pc.cast(data[column], pa.string())).to_pylist()
+        result = {item["values"]: item["counts"] for item in counts}
+    else:
+        import numpy as np
+        codes = data[column]
+        categories = list(data[f"{column}__categories"])
+        counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+        result = {str(category): int(count) for category, count in zip(categories, counts) if count}
+        missing = int((codes < 0).sum())
+        if missing:
+            result[None] = missing
+    # Most common first, like the $group/$sort pipelines in Deduplicator.
+    return dict(sorted(result.items(), key=lambda item: -item[1]))
+
+def _host_age_counts(kind: str, data: Any, cutoff: datetime) -> Dict[str, int]:
+    if kind == "parquet":
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        last_seen = data["last_seen"]
+        bound = pa.scalar(cutoff, type=last_seen.type)
+        old = pc.sum(pc.less(last_seen, bound)).as_py() or 0
+        new = pc.sum(pc.greater_equal(last_seen, bound)).as_py() or 0
+    else:
+        import numpy as np
+        last_seen = data["last_seen"]
+        seen = last_seen[~np.isnat(last_seen)]
+        bound = np.datetime64(cutoff.astimezone(pytz.UTC).replace(tzinfo=None), "ms")
+        old = int((seen < bound).sum())
+        new = int((seen >= bound).sum())
+    return {"old_hosts": int(old), "new_hosts": int(new)}
+
+def export_stats(out_dir: str, now: Optional[datetime] = None) -> Dict[str, Dict[Any, int]]:
+    """The ``Deduplicator.get_stats`` distributions, computed vectorized over an export."""
+    kind, data = _load(out_dir, ("os_version", "platform", "last_seen"))
+    cutoff = (now or datetime.now(pytz.UTC)) - timedelta(days=30)
+    return {
+        "os_distribution": _value_counts(kind, data, "os_version"),
+        "host_age_distribution": _host_age_counts(kind, data, cutoff),
+        "cloud_provider_distribution": _value_counts(kind, data, "platform"),
+    }
+
+def get_os_distribution(out_dir: str) -> Dict[Any, int]:
+    kind, data = _load(out_dir, ("os_version",))
+    return _value_counts(kind, data, "os_version")
+
+def get_host_age_distribution(out_dir: str, now: Optional[datetime] = None) -> Dict[str, int]:
+    kind, data = _load(out_dir, ("last_seen",))
+    return _host_age_counts(kind, data, (now or datetime.now(pytz.UTC)) - timedelta(days=30))
+
+def get_cloud_provider_distribution(out_dir: str) -> Dict[Any, int]:
+    kind, data = _load(out_dir, ("platform",))
+    return _value_counts(kind, data, "platform")
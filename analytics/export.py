@@ -0,0 +1,210 @@
+import os
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from normalizers.timestamps import to_utc
+
+# Column kinds: "string", "category" (dictionary-encoded), "int" and "timestamp" (UTC, ms).
+HOST_COLUMNS: Dict[str, str] = {
+    "_id": "string",
+    "host_id": "string",
+    "hostname": "string",
+    "local_ip": "string",
+    "external_ip": "string",
+    "mac_address": "string",
+    "os_version": "category",
+    "platform": "category",
+    "source": "category",
+    "status": "category",
+    "first_seen": "timestamp",
+    "last_seen": "timestamp",
+}
+
+# Nested host lists flattened into one row per item; ``host_row`` points back into the hosts table.
+CHILD_TABLES: Dict[str, Dict[str, str]] = {
+    "software": {"name": "category", "version": "category"},
+    "open_ports": {"port": "int", "protocol": "category", "service": "category"},
+    "vulnerabilities": {"qid": "int", "first_found": "timestamp", "last_found": "timestamp"},
+}
+CHILD_KEY_COLUMNS: Dict[str, str] = {"host_row": "int", "host": "string"}
+
+FORMATS = ("parquet", "npz")
+
+# Missing values in the npz fallback, which has no null support.
+MISSING_INT = -1
+MISSING_TIMESTAMP = -2 ** 63  # numpy's NaT for datetime64[ms]
+
+def _table_columns(table: str) -> Dict[str, str]:
+    if table == "hosts":
+        return HOST_COLUMNS
+    return {**CHILD_KEY_COLUMNS, **CHILD_TABLES[table]}
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return to_utc(value)
+    except (TypeError, ValueError):
+        return None
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _category(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+CONVERTERS = {"string": _category, "category": _category, "int": _int, "timestamp": _timestamp}
+
+def default_format() -> str:
+    """Parquet when pyarrow is installed, otherwise the npz fallback."""
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "npz"
+
+
+class _ParquetSink:
+    """One Parquet file per table, written one row group per batch."""
+
+    def __init__(self, out_dir: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.pq = pq
+        self.out_dir = out_dir
+        self.types = {
+            "string": pa.string(),
+            "category": pa.dictionary(pa.int32(), pa.string()),
+            "int": pa.int64(),
+            "timestamp": pa.timestamp("ms", tz="UTC"),
+        }
+        self._writers: Dict[str, Any] = {}
+
+    def _schema(self, table: str):
+        return self.pa.schema([(name, self.types[kind]) for name, kind in _table_columns(table).items()])
+
+    def _array(self, values: List[Any], kind: str):
+        if kind == "category":
+            return self.pa.array(values, type=self.pa.string()).dictionary_encode()
+        return self.pa.array(values, type=self.types[kind])
+
+    def _writer(self, table: str):
+        if table not in self._writers:
+            path = os.path.join(self.out_dir, f"{table}.parquet")
+            self._writers[table] = self.pq.ParquetWriter(path, self._schema(table), compression="zstd")
+        return self._writers[table]
+
+    def write(self, table: str, columns: Dict[str, List[Any]]) -> None:
+        kinds = _table_columns(table)
+        arrays = [self._array(columns[name], kind) for name, kind in kinds.items()]
+        self._writer(table).write_table(self.pa.Table.from_arrays(arrays, schema=self._schema(table)))
+
+    def close(self) -> None:
+        for table in ["hosts", *CHILD_TABLES]:
+            # Tables that received no rows still get a file with the right schema.
+            self._writer(table).close()
+
+
+class _NpzSink:
+    """Accumulates numeric and categorical columns into one ``.npz`` per table.
+
+    Categorical columns are stored as int32 codes plus a ``<column>__categories``
+    array (code -1 is null); ints use -1 and timestamps NaT for missing values.
+    Free-text string columns need pyarrow and are left out here.
+    """
+
+    def __init__(self, out_dir: str):
+        import numpy
+        self.np = numpy
+        self.out_dir = out_dir
+        self._columns: Dict[str, Dict[str, array]] = {}
+        self._categories: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def write(self, table: str, columns: Dict[str, List[Any]]) -> None:
+        buffers = self._columns.setdefault(table, {})
+        for name, kind in _table_columns(table).items():
+            values = columns[name]
+            if kind == "category":
+                categories = self._categories.setdefault((table, name), {})
+                codes = buffers.setdefault(name, array("i"))
+                codes.extend(-1 if value is None else categories.setdefault(value, len(categories)) for value in values)
+            elif kind == "int":
+                buffers.setdefault(name, array("q")).extend(MISSING_INT if value is None else value for value in values)
+            elif kind == "timestamp":
+                buffers.setdefault(name, array("q")).extend(
+                    MISSING_TIMESTAMP if value is None else int(value.timestamp() * 1000) for value in values
+                )
+
+    def close(self) -> None:
+        np = self.np
+        for table in ["hosts", *CHILD_TABLES]:
+            buffers = self._columns.get(table, {})
+            arrays: Dict[str, Any] = {}
+            for name, kind in _table_columns(table).items():
+                if kind == "string":
+                    continue
+                data = buffers.get(name, array("i" if kind == "category" else "q"))
+                if kind == "category":
+                    arrays[name] = np.frombuffer(data, dtype=np.int32)
+                    arrays[f"{name}__categories"] = np.array(list(self._categories.get((table, name), {})), dtype=str)
+                elif kind == "timestamp":
+                    arrays[name] = np.frombuffer(data, dtype=np.int64).view("datetime64[ms]")
+                else:
+                    arrays[name] = np.frombuffer(data, dtype=np.int64)
+            np.savez_compressed(os.path.join(self.out_dir, f"{table}.npz"), **arrays)
+
+
+def _batches(collection, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    projection = {name: 1 for name in list(HOST_COLUMNS) + list(CHILD_TABLES)}
+    batch: List[Dict[str, Any]] = []
+    for doc in collection.find({}, projection, batch_size=batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_hosts(collection, out_dir: str, fmt: Optional[str] = None, batch_size: int = 5000) -> Dict[str, int]:
+    """Stream a merged ``hosts`` collection into columnar files under ``out_dir``.
+
+    Writes ``hosts`` plus one child table per entry in ``CHILD_TABLES`` as
+    Parquet (``fmt="parquet"``, needs pyarrow) or ``.npz`` (``fmt="npz"``,
+    needs numpy). Only one batch of documents is held in memory at a time
+    for Parquet. Returns the row count of each table.
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    sink = _ParquetSink(out_dir) if fmt == "parquet" else _NpzSink(out_dir)
+
+    counts = {table: 0 for table in ["hosts", *CHILD_TABLES]}
+    for batch in _batches(collection, batch_size):
+        hosts: Dict[str, List[Any]] = {name: [] for name in HOST_COLUMNS}
+        children = {table: {name: [] for name in _table_columns(table)} for table in CHILD_TABLES}
+        for offset, doc in enumerate(batch):
+            row = counts["hosts"] + offset
+            for name, kind in HOST_COLUMNS.items():
+                hosts[name].append(CONVERTERS[kind](doc.get(name)))
+            for table, fields in CHILD_TABLES.items():
+                columns = children[table]
+                for item in doc.get(table) or []:
+                    columns["host_row"].append(row)
+                    columns["host"].append(str(doc["_id"]))
+                    for name, kind in fields.items():
+                        columns[name].append(CONVERTERS[kind](item.get(name)))
+        sink.write("hosts", hosts)
+        counts["hosts"] += len(batch)
+        for table, columns in children.items():
+            if columns["host_row"]:
+                sink.write(table, columns)
+                counts[table] += len(columns["host_row"])
+    sink.close()
+    return counts
@@ -0,0 +1,46 @@
+"""Per-host memory of normalized hosts as dicts vs CompactHost records.
+
+Usage: python -m benchmarks.bench_memory [--hosts N] [--normalizer backup]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.bench_normalize import NORMALIZERS, synthetic_qualys_hosts
+from normalizers.records import as_document, compact_hosts
+
+def _retained_bytes(build: Callable[[], List[Any]]) -> int:
+    """Bytes still allocated after ``build`` returns, while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del result
+    return retained
+
+def run(hosts_count: int, normalizer_cls) -> Dict[str, Any]:
+    raw_hosts = synthetic_qualys_hosts(hosts_count)
+    normalized = normalizer_cls.normalize_hosts(raw_hosts, "qualys")
+    assert [as_document(host) for host in compact_hosts(normalized)] == normalized, "compact round trip differs"
+    del normalized
+
+    dict_bytes = _retained_bytes(lambda: normalizer_cls.normalize_hosts(raw_hosts, "qualys"))
+    compact_bytes = _retained_bytes(lambda: compact_hosts(normalizer_cls.normalize_hosts(raw_hosts, "qualys")))
+    return {
+        "hosts": hosts_count,
+        "dict_bytes_per_host": dict_bytes // hosts_count,
+        "compact_bytes_per_host": compact_bytes // hosts_count,
+        "reduction": round(1 - compact_bytes / dict_bytes, 3),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=5000)
+    parser.add_argument("--normalizer", choices=sorted(NORMALIZERS), default="backup")
+    args = parser.parse_args()
+    print(json.dumps(run(args.hosts, NORMALIZERS[args.normalizer]), indent=2))
@@ -0,0 +1,88 @@
+"""Serial vs parallel normalization on synthetic Qualys payloads.
+
+Times both ParallelNormalizer entry points: ``normalize_hosts`` over decoded
+dicts, in chunks of ``--chunk-size``, and ``normalize_pages`` over raw JSON
+pages of ``--page-size`` hosts (decode included on both sides of that
+comparison).
+
+Usage: python -m benchmarks.bench_normalize [--hosts N] [--workers W] [--chunk-size 256] [--page-size 100] [--normalizer backup]
+"""
+import argparse
+import copy
+import json
+import time
+from typing import Any, Dict, List
+
+from normalizers import backup_normalizer, normalizer
+from normalizers.parallel_normalizer import ParallelNormalizer
+
+SAMPLE_PATH = "data/qualys_host_data.txt"
+
+NORMALIZERS = {
+    "normalizer": normalizer.Normalizer,
+    "backup": backup_normalizer.Normalizer,
+}
+
+def synthetic_qualys_hosts(count: int, path: str = SAMPLE_PATH) -> List[Dict[str, Any]]:
+    """Replicate the sample hosts, giving each copy a distinct identity."""
+    with open(path) as f:
+        samples = json.load(f)
+    hosts = []
+    for i in range(count):
+        host = copy.deepcopy(samples[i % len(samples)])
+        host["_id"] = i
+        host["name"] = host["dnsHostName"] = f"bench-host-{i}.ec2.internal"
+        host["address"] = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        hosts.append(host)
+    return hosts
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def run(hosts_count: int, workers: int, chunk_size: int, page_size: int, normalizer_cls) -> Dict[str, Any]:
+    hosts = synthetic_qualys_hosts(hosts_count)
+    pages = [json.dumps(hosts[start:start + page_size]).encode("utf-8") for start in range(0, len(hosts), page_size)]
+
+    serial, serial_seconds = _timed(normalizer_cls.normalize_hosts, hosts, "qualys")
+    serial_pages, serial_pages_seconds = _timed(
+        lambda: [h for page in pages for h in normalizer_cls.normalize_hosts(json.loads(page), "qualys")]
+    )
+
+    with ParallelNormalizer(workers=workers, chunk_size=chunk_size, min_parallel=0, normalizer_cls=normalizer_cls) as parallel_normalizer:
+        # Start the pool before timing so process spawn cost is not counted.
+        parallel_normalizer.normalize_pages(pages[:workers * 2], "qualys")
+        parallel, parallel_seconds = _timed(parallel_normalizer.normalize_hosts, hosts, "qualys")
+        parallel_pages, parallel_pages_seconds = _timed(parallel_normalizer.normalize_pages, pages, "qualys")
+
+    assert parallel == serial, "parallel output differs from serial output"
+    assert parallel_pages == serial_pages == serial, "parallel page output differs from serial output"
+    return {
+        "hosts": hosts_count,
+        "workers": workers,
+        "chunk_size": chunk_size,
+        "page_size": page_size,
+        "decoded_hosts": {
+            "serial_seconds": round(serial_seconds, 4),
+            "parallel_seconds": round(parallel_seconds, 4),
+            "speedup": round(serial_seconds / parallel_seconds, 2),
+        },
+        "raw_pages": {
+            "serial_seconds": round(serial_pages_seconds, 4),
+            "parallel_seconds": round(parallel_pages_seconds, 4),
+            "speedup": round(serial_pages_seconds / parallel_pages_seconds, 2),
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--normalizer", choices=sorted(NORMALIZERS), default="backup")
+    args = parser.parse_args()
+
+    workers = args.workers or ParallelNormalizer().workers
+    print(json.dumps(run(args.hosts, workers, args.chunk_size, args.page_size, NORMALIZERS[args.normalizer]), indent=2))
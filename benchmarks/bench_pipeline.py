@@ -0,0 +1,140 @@
+"""End-to-end pipeline benchmark on synthetic Qualys + CrowdStrike hosts.
+
+Times fetch, normalize, deduplicate_and_merge and the distribution stats
+(uncached, then from the TTL cache) at each size, and reports throughput, peak RSS and MongoDB command
+round trips per stage as JSON. Each size runs in a fresh process against its
+own scratch database so peak RSS is not carried over between sizes.
+
+Usage: python -m benchmarks.bench_pipeline [--sizes 10000,100000,1000000] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+from pymongo import MongoClient, monitoring
+
+from deduplication.deduplicator import Deduplicator
+from fetchers.synthetic_fetcher import synthetic_sources
+from normalizers.normalizer import Normalizer
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts MongoDB commands sent by every client in this process."""
+
+    def __init__(self):
+        self.commands: Counter = Counter()
+
+    def started(self, event) -> None:
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event) -> None:
+        pass
+
+    def failed(self, event) -> None:
+        pass
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _stage(counter: CommandCounter, items: int, func: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+    before = dict(counter.commands)
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+    round_trips = {name: count - before.get(name, 0) for name, count in counter.commands.items() if count != before.get(name, 0)}
+    return result, {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "items_per_second": round(items / seconds, 1) if seconds else None,
+        "mongo_round_trips": sum(round_trips.values()),
+        "mongo_commands": round_trips,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+async def _fetch_all(fetcher, page_size: int) -> List[Dict[str, Any]]:
+    hosts: List[Dict[str, Any]] = []
+    async for page in fetcher.iter_pages(skip=0, limit=page_size):
+        hosts.extend(page)
+    return hosts
+
+def _normalize_all(qualys_hosts: List[Dict[str, Any]], crowdstrike_hosts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return Normalizer.normalize_hosts(qualys_hosts, "qualys") + Normalizer.normalize_hosts(crowdstrike_hosts, "crowdstrike")
+
+def run_size(size: int, db_url: str, db_prefix: str, page_size: int, batch_size: int, duplicate_rate: float, seed: int) -> Dict[str, Any]:
+    counter = CommandCounter()
+    monitoring.register(counter)
+    db_name = f"{db_prefix}_{size}"
+    MongoClient(db_url).drop_database(db_name)
+
+    qualys, crowdstrike = synthetic_sources(size, seed=seed, duplicate_rate=duplicate_rate)
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    (qualys_hosts, crowdstrike_hosts), stages["fetch"] = _stage(counter, 2 * size, lambda: (
+        asyncio.run(_fetch_all(qualys, page_size)),
+        asyncio.run(_fetch_all(crowdstrike, page_size)),
+    ))
+    all_hosts, stages["normalize"] = _stage(counter, 2 * size, partial(_normalize_all, qualys_hosts, crowdstrike_hosts))
+    # The raw hosts are not needed past normalization; free them before the merge stage.
+    del qualys_hosts, crowdstrike_hosts
+
+    deduplicator = Deduplicator(db_url, db_name, batch_size=batch_size, write_batch_size=batch_size)
+    _, stages["deduplicate_and_merge"] = _stage(counter, len(all_hosts), lambda: deduplicator.deduplicate_and_merge(all_hosts))
+    stored = deduplicator.hosts_collection.estimated_document_count()
+    # All three distributions come from one $facet aggregation; time it uncached, then the TTL-cache hit.
+    deduplicator.invalidate_stats()
+    _, stages["get_stats"] = _stage(counter, stored, deduplicator.get_stats)
+    _, stages["get_stats_cached"] = _stage(counter, stored, deduplicator.get_stats)
+
+    deduplicator.client.drop_database(db_name)
+    return {
+        "size_per_source": size,
+        "input_hosts": 2 * size,
+        "stored_hosts": stored,
+        "duplicate_rate": duplicate_rate,
+        "stages": stages,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="hosts per source, comma separated")
+    parser.add_argument("--db-url", default="mongodb://127.0.0.1:27017/")
+    parser.add_argument("--db-prefix", default="silk_bench")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    runs = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            runs.append(executor.submit(
+                run_size, size, args.db_url, args.db_prefix, args.page_size,
+                args.batch_size, args.duplicate_rate, args.seed,
+            ).result())
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "runs": runs,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
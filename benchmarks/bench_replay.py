@@ -0,0 +1,47 @@
+"""Replay the data/ samples from a page spool and time decode + normalize per decoder.
+
+Usage: python -m benchmarks.bench_replay [--copies N] [--page-size P]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+from fetchers.decoding import available_decoders, get_decoder
+from fetchers.spool import PageSpool, iter_spooled_pages, spool_sample_file
+from normalizers.normalizer import Normalizer
+
+SAMPLES = {
+    "qualys": "data/qualys_host_data.txt",
+    "crowdstrike": "data/croudstrike_host_data.txt",
+}
+
+def build_spool(path: str, copies: int, page_size: int) -> int:
+    with PageSpool(path) as spool:
+        return sum(
+            spool_sample_file(sample, source, spool, page_size=page_size, copies=copies)
+            for source, sample in SAMPLES.items()
+        )
+
+def replay(path: str, decoder_name: str) -> Dict[str, Any]:
+    decode = get_decoder(decoder_name)
+    hosts = 0
+    started = time.perf_counter()
+    for source, _, page in iter_spooled_pages(path, decoder=decode):
+        hosts += len(Normalizer.normalize_hosts(page, source))
+    seconds = time.perf_counter() - started
+    return {"decoder": decoder_name, "hosts": hosts, "seconds": round(seconds, 4), "hosts_per_second": round(hosts / seconds, 1)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pages.jsonl.gz")
+        total = build_spool(path, args.copies, args.page_size)
+        results = [replay(path, name) for name in available_decoders()]
+        print(json.dumps({"spooled_hosts": total, "spool_bytes": os.path.getsize(path), "replays": results}, indent=2))
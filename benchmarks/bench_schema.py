@@ -0,0 +1,56 @@
+"""Compiled schema mapper vs the hand-written Normalizer.
+
+Times ``normalize_qualys_host`` per host and ``normalize_hosts`` per batch
+for both, after checking that they produce identical documents.
+
+Usage: python -m benchmarks.bench_schema [--hosts N] [--repeat R]
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from fetchers.synthetic_fetcher import SyntheticFetcher
+from normalizers.normalizer import Normalizer
+from normalizers.schema import SchemaNormalizer, compile_schema
+
+def _best_of(repeat: int, func: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run(hosts_count: int, repeat: int) -> Dict[str, Any]:
+    # Shallow synthetic copies: nested sample lists are shared, so large runs stay small in memory.
+    hosts: List[Dict[str, Any]] = SyntheticFetcher("qualys", hosts_count).page(0, hosts_count)
+    schema_normalizer = SchemaNormalizer("standard")
+    compiled = compile_schema("standard")["qualys"]
+    assert schema_normalizer.normalize_hosts(hosts, "qualys") == Normalizer.normalize_hosts(hosts, "qualys"), \
+        "compiled mapper output differs from Normalizer"
+
+    handwritten_host = _best_of(repeat, lambda: [Normalizer.normalize_qualys_host(host) for host in hosts])
+    compiled_host = _best_of(repeat, lambda: [compiled(host) for host in hosts])
+    handwritten_batch = _best_of(repeat, lambda: Normalizer.normalize_hosts(hosts, "qualys"))
+    compiled_batch = _best_of(repeat, lambda: schema_normalizer.normalize_hosts(hosts, "qualys"))
+    return {
+        "hosts": hosts_count,
+        "per_host": {
+            "handwritten_us": round(handwritten_host / hosts_count * 1e6, 3),
+            "compiled_us": round(compiled_host / hosts_count * 1e6, 3),
+            "speedup": round(handwritten_host / compiled_host, 2),
+        },
+        "normalize_hosts": {
+            "handwritten_seconds": round(handwritten_batch, 4),
+            "compiled_seconds": round(compiled_batch, 4),
+            "speedup": round(handwritten_batch / compiled_batch, 2),
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.hosts, args.repeat), indent=2))
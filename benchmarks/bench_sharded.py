@@ -0,0 +1,103 @@
+"""Scaling of ShardedDeduplicator over worker counts.
+
+Builds synthetic Qualys + CrowdStrike hosts from the samples in ``data/``,
+normalizes them once, then merges them into a fresh scratch database with
+each worker count. Reports wall time, per-phase time (partition, shard
+merge, held-back merge, reconciliation), speedup over the first worker
+count (1 by default) and the stored host count, which must be the same for
+every worker count: the run fails if it is not.
+
+Run from the repository root (the samples are read from ``data/``).
+
+Usage: python -m benchmarks.bench_sharded [--size 100000] [--workers 1,2,4,8] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pymongo import MongoClient
+
+from deduplication.sharded import ShardedDeduplicator
+from fetchers.synthetic_fetcher import synthetic_sources
+from instrumentation.metrics import metrics
+from normalizers.normalizer import Normalizer
+
+PHASES = ("shard_partition", "shard_merge", "shard_deferred_merge", "reconcile")
+
+def _phase_seconds() -> Dict[str, float]:
+    seconds = {phase: 0.0 for phase in PHASES}
+    for histogram in metrics.to_dict()["histograms"]:
+        phase = histogram["name"][:-len("_seconds")]
+        if phase in seconds:
+            seconds[phase] += histogram["sum"]
+    return {phase: round(value, 4) for phase, value in seconds.items()}
+
+def run_workers(hosts: List[Dict[str, Any]], workers: int, db_url: str, db_name: str, batch_size: int) -> Dict[str, Any]:
+    MongoClient(db_url).drop_database(db_name)
+    metrics.reset()
+    with ShardedDeduplicator(db_url, db_name, workers=workers, batch_size=batch_size, write_batch_size=batch_size) as sharded:
+        # Process spawn and MongoClient setup are not counted.
+        sharded.start()
+        started = time.perf_counter()
+        sharded.deduplicate_and_merge(hosts)
+        seconds = time.perf_counter() - started
+        stored = sharded.deduplicator.hosts_collection.count_documents({})
+        deferred = sum(
+            counter["value"] for counter in metrics.to_dict()["counters"] if counter["name"] == "shard_deferred_hosts_total"
+        )
+    MongoClient(db_url).drop_database(db_name)
+    return {
+        "workers": workers,
+        "seconds": round(seconds, 4),
+        "hosts_per_second": round(len(hosts) / seconds, 1),
+        "phases": _phase_seconds(),
+        "deferred_hosts": deferred,
+        "stored_hosts": stored,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100000, help="hosts per source")
+    parser.add_argument("--workers", default="1,2,4,8", help="worker counts, comma separated")
+    parser.add_argument("--db-url", default="mongodb://127.0.0.1:27017/")
+    parser.add_argument("--db-name", default="silk_bench_sharded")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    qualys, crowdstrike = synthetic_sources(args.size, seed=args.seed, duplicate_rate=args.duplicate_rate)
+    hosts = Normalizer.normalize_hosts(qualys.page(0, args.size), "qualys") \
+        + Normalizer.normalize_hosts(crowdstrike.page(0, args.size), "crowdstrike")
+
+    metrics.enable()
+    runs = [
+        run_workers(hosts, workers, args.db_url, args.db_name, args.batch_size)
+        for workers in [int(workers) for workers in args.workers.split(",")]
+    ]
+    stored = {run["workers"]: run["stored_hosts"] for run in runs}
+    assert len(set(stored.values())) == 1, f"stored host counts differ between worker counts: {stored}"
+    baseline = runs[0]["seconds"]
+    for run in runs:
+        run["speedup"] = round(baseline / run["seconds"], 2)
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "input_hosts": len(hosts),
+        "runs": runs,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
@@ -0,0 +1,44 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from deduplication.deduplicator import Deduplicator
+
+class AsyncDeduplicator:
+    """Awaitable front for a ``Deduplicator`` that keeps pymongo off the event loop.
+
+    Writes go through a single thread, so merges are applied in the order
+    they were submitted; reads such as the stats queries use a small
+    separate pool and can run while a merge is in progress.
+    """
+
+    def __init__(self, deduplicator: Deduplicator, read_workers: int = 2):
+        self.deduplicator = deduplicator
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mongo-write")
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="mongo-read")
+
+    async def write(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call that writes to MongoDB, after all earlier writes."""
+        return await asyncio.get_event_loop().run_in_executor(self._writer, func, *args)
+
+    async def read(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_event_loop().run_in_executor(self._readers, func, *args)
+
+    async def deduplicate_and_merge(self, hosts: List[Any]) -> None:
+        await self.write(self.deduplicator.deduplicate_and_merge, hosts)
+
+    async def reconcile(self) -> int:
+        return await self.write(self.deduplicator.reconcile)
+
+    async def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return await self.read(self.deduplicator.get_stats)
+
+    def close(self) -> None:
+        self._writer.shutdown()
+        self._readers.shutdown()
+
+    def __enter__(self) -> "AsyncDeduplicator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
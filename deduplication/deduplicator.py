@@ -1,130 +1,477 @@
-from typing import List, Dict, Any
-from pymongo import MongoClient, UpdateOne
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from collections import Counter
+import time
+from bson import ObjectId
+from pymongo import ASCENDING, MongoClient, DeleteOne, IndexModel, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 from datetime import datetime, timedelta
 import pytz
-from dateutil.parser import parse as date_parse
+from instrumentation.metrics import metrics
+from normalizers.records import as_documents
+from deduplication.identity_index import DEFAULT_MATCH_KEYS, KEYS_FIELD, IdentityIndex, UnionFind
+from deduplication.merge_policy import MergeEngine
+from deduplication.run_journal import RunJournal, open_journal
+
+# Marker in the migrations collection once backfill_keys has run.
+KEYS_MIGRATION = "keys_field_aliases"
 
 class Deduplicator:
-    def __init__(self, mongo_uri: str, db_name: str):
-        self.client = MongoClient(mongo_uri)
+    MATCH_KEYS = DEFAULT_MATCH_KEYS
+    # Fields grouped or range-filtered by the distribution queries. They are not indexed:
+    # the stats aggregation reads every document, so an index would only slow writes.
+    STATS_KEYS = ("last_seen", "os_version", "platform")
+
+    def __init__(
+        self,
+        mongo_uri: str,
+        db_name: str,
+        batch_size: int = 1000,
+        write_batch_size: int = 1000,
+        match_keys: Iterable[str] = DEFAULT_MATCH_KEYS,
+        blocklist: Optional[Iterable[str]] = None,
+        warm_index: bool = False,
+        create_indexes: bool = True,
+        background_indexes: bool = True,
+        stats_ttl: float = 60.0,
+        maintain_summary: bool = False,
+        merge_policies: Optional[Dict[str, Any]] = None,
+        minimal_updates: bool = True,
+        journal: Optional[Any] = None,
+    ):
+        # tz_aware so stored dates come back as UTC datetimes, comparable with normalized ones.
+        self.client = MongoClient(mongo_uri, tz_aware=True)
         self.db = self.client[db_name]
         self.hosts_collection = self.db["hosts"]
+        self.migrations_collection = self.db["migrations"]
+        self.batch_size = batch_size
+        self.write_batch_size = write_batch_size
+        self.identity_index = IdentityIndex(match_keys, blocklist)
+        self.merge_engine = MergeEngine(merge_policies)
+        # Send $set/$addToSet updates for single-document clusters instead of full replacements.
+        self.minimal_updates = minimal_updates
+        # Per-value counters kept in step with the hosts collection when maintain_summary is set.
+        self.summary_collection = self.db["host_stats"]
+        self.maintain_summary = maintain_summary
+        self.stats_ttl = stats_ttl
+        self._stats_cache: Optional[Tuple[float, Dict[str, Dict[str, int]]]] = None
+        # Write-ahead log of merge batches: a RunJournal, a SQLite path or "mongodb".
+        if isinstance(journal, str):
+            journal = open_journal(journal, self.db)
+        self.journal: Optional[RunJournal] = journal
+        if create_indexes:
+            self.ensure_indexes(background=background_indexes)
+            self.backfill_keys()
+        if journal is not None:
+            self.recover()
+        if warm_index:
+            self.identity_index.warm_load(self.hosts_collection)
+        if maintain_summary and self.summary_collection.estimated_document_count() == 0 \
+                and self.hosts_collection.estimated_document_count() > 0:
+            self.rebuild_summary()
 
-    def deduplicate_and_merge(self, hosts: List[Dict[str, Any]]) -> None:
-        for host in hosts:
-            existing_host = self.hosts_collection.find_one({
-                "$or": [
-                    {"hostname": host["hostname"]},
-                    {"external_ip": host["external_ip"]},
-                    {"local_ip": host["local_ip"]},
-                    {"mac_address": host.get("mac_address")},
-                ]
-            })
-
-            if existing_host:
-                merged_host = self._merge_hosts(existing_host, host)
-                self.hosts_collection.replace_one({"_id": existing_host["_id"]}, merged_host)
-            else:
-                self.hosts_collection.insert_one(host)
-                
-    # def deduplicate_and_merge(self, hosts: List[Dict[str, Any]], batch_size: int = 1000) -> None:
-    #     operations = []
-    #     for host in hosts:
-    #         query = {
-    #             "$or": [
-    #                 {"hostname": host["hostname"]},
-    #                 {"external_ip": host["external_ip"]},
-    #                 {"local_ip": host["local_ip"]},
-    #                 {"mac_address": host.get("mac_address")},
-    #             ]
-    #         }
-
-    #         existing_host = self.hosts_collection.find_one(query)
-
-    #         if existing_host:
-    #             merged_host = self._merge_hosts(existing_host, host)
-    #             operations.append(UpdateOne({"_id": existing_host["_id"]}, {"$set": merged_host}))
-    #         else:
-    #             # Remove the '_id' key if it exists
-    #             if "_id" in host:
-    #                 del host["_id"]
-    #             operations.append(UpdateOne(query, {"$setOnInsert": host}, upsert=True))
-
-    #         if len(operations) >= batch_size:
-    #             self._execute_batch(operations)
-    #             operations = []
-
-    #     if operations:
-    #         self._execute_batch(operations)
-
-    # def _execute_batch(self, operations: List[UpdateOne]) -> None:
-    #     try:
-    #         self.hosts_collection.bulk_write(operations)
-    #     except Exception as e:
-    #         print(f"Error performing bulk write: {e}")
+    def required_fields(self) -> Tuple[str, ...]:
+        """Fields normalized hosts must carry: match keys, stats keys and the source."""
+        keys = tuple(self.identity_index.match_keys)
+        return keys + tuple(key for key in self.STATS_KEYS if key not in keys) + ("source",)
 
-    def _merge_hosts(self, host1: Dict[str, Any], host2: Dict[str, Any]) -> Dict[str, Any]:
-        merged = host1.copy()
-        for key, value in host2.items():
-            if key in ["last_seen", "first_seen"]:
-                merged[key] = self._max_date(host1.get(key), host2.get(key))
-            elif key == "source":
-                merged[key] = f"{host1.get('source', '')},{host2['source']}".strip(',')
-            elif key in ["tags"]:
-                merged[key] = self._merge_lists(merged.get(key, []), value)
+    def index_models(self, background: bool = True) -> List[IndexModel]:
+        """Indexes backing the match lookups."""
+        return [
+            # Multikey on the normalized aliases, partial on strings so hosts without the key are left out.
+            IndexModel(
+                [(f"{KEYS_FIELD}.{key}", ASCENDING)],
+                name=f"{KEYS_FIELD}.{key}_1",
+                partialFilterExpression={f"{KEYS_FIELD}.{key}": {"$type": "string"}},
+                background=background,
+            )
+            for key in self.identity_index.match_keys
+        ]
+
+    def ensure_indexes(self, background: bool = True) -> List[str]:
+        """Create any missing indexes; existing identical indexes are left untouched.
+
+        The single-field stats indexes earlier versions created are dropped.
+        """
+        try:
+            existing = self.hosts_collection.index_information()
+            for name in (f"{key}_1" for key in self.STATS_KEYS):
+                if name in existing:
+                    self.hosts_collection.drop_index(name)
+            return self.hosts_collection.create_indexes(self.index_models(background))
+        except OperationFailure as e:
+            print(f"Error creating indexes: {e}")
+            return []
+
+    def backfill_keys(self) -> int:
+        """One-off migration storing the normalized key field on hosts written before it; returns the hosts updated.
+
+        Done once per database: a marker in ``migrations`` turns later calls into a single lookup.
+        """
+        if self.migrations_collection.find_one({"_id": KEYS_MIGRATION}) is not None:
+            return 0
+        operations: List[Any] = []
+        updated = 0
+        for doc in self.hosts_collection.find({}, self.identity_index.projection()):
+            key_fields = self.identity_index.key_fields([doc])
+            if doc.get(KEYS_FIELD) == key_fields:
+                continue
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {KEYS_FIELD: key_fields}}))
+            if len(operations) == self.write_batch_size:
+                self._execute_batch(operations)
+                updated += len(operations)
+                operations = []
+        if operations:
+            self._execute_batch(operations)
+            updated += len(operations)
+        self.migrations_collection.update_one(
+            {"_id": KEYS_MIGRATION}, {"$set": {"applied_at": datetime.now(pytz.UTC), "updated": updated}}, upsert=True
+        )
+        return updated
+
+    def deduplicate_and_merge(self, hosts: List[Any], batch_size: Optional[int] = None) -> None:
+        batch_size = batch_size or self.batch_size
+        for start in range(0, len(hosts), batch_size):
+            with metrics.timer("merge_batch"):
+                self._merge_batch(hosts[start:start + batch_size])
+        metrics.increment("merged_hosts_total", len(hosts))
+
+    def _merge_batch(self, hosts: List[Dict[str, Any]]) -> None:
+        """Resolve one batch into identity clusters and persist them with bulk writes."""
+        hosts = as_documents(hosts)
+        existing = self._find_existing(hosts)
+        operations: List[Any] = []
+        summary_delta: Counter = Counter()
+        for cluster_hosts, cluster_docs in self.identity_index.resolve(hosts, existing):
+            if cluster_docs:
+                primary, *others = sorted(cluster_docs, key=lambda doc: str(doc["_id"]))
+                merged = primary
+                for other in others:
+                    # Stored documents linked through this batch collapse into one.
+                    merged = self._merge_hosts(merged, {k: v for k, v in other.items() if k != "_id"})
+                    operations.append(DeleteOne({"_id": other["_id"]}))
+                pending = cluster_hosts
             else:
-                # Prefer non-null values
-                merged[key] = value if value is not None else merged.get(key)
-        return merged
-
-    def _max_date(self, date1: Any, date2: Any) -> datetime:
-        """Convert strings to datetime objects and return the maximum date."""
-        date1 = self._convert_to_utc(date1)
-        date2 = self._convert_to_utc(date2)
-        return max(date1, date2)
-
-    def _convert_to_utc(self, date: Any) -> datetime:
-        """Convert a date to a UTC datetime object."""
-        if isinstance(date, str):
-            try:
-                # Remove redundant 'Z' if there is already a timezone offset
-                if date.endswith('Z') and '+' in date:
-                    date = date.rstrip('Z')
-                date = date_parse(date).astimezone(pytz.UTC)
-            except ValueError:
-                raise ValueError(f"Invalid date format: {date}")
-        elif isinstance(date, datetime):
-            if date.tzinfo is None:
-                date = date.replace(tzinfo=pytz.UTC)
+                merged = {"_id": ObjectId(), **cluster_hosts[0]}
+                pending = cluster_hosts[1:]
+            for host in pending:
+                merged = self._merge_hosts(merged, host)
+            # Every alias the cluster holds, not just the values left in merged's own fields.
+            merged[KEYS_FIELD] = self.identity_index.key_fields([merged, *cluster_docs, *cluster_hosts])
+
+            if cluster_docs:
+                if others or merged != primary:
+                    if self.minimal_updates and not others:
+                        operations.append(UpdateOne({"_id": merged["_id"]}, self.merge_engine.update_for(primary, merged)))
+                    else:
+                        operations.append(ReplaceOne({"_id": merged["_id"]}, merged))
+                    if self.maintain_summary:
+                        summary_delta.subtract(pair for doc in cluster_docs for pair in _summary_values(doc))
+                        summary_delta.update(_summary_values(merged))
             else:
-                date = date.astimezone(pytz.UTC)
-        return date
+                operations.append(InsertOne(merged))
+                if self.maintain_summary:
+                    summary_delta.update(_summary_values(merged))
+            if self.identity_index.warm:
+                for doc in cluster_docs:
+                    self.identity_index.unregister(doc)
+                self.identity_index.register(merged)
 
-    def _merge_lists(self, list1: List[Any], list2: List[Any]) -> List[Any]:
-        merged = list1.copy()
-        for item in list2:
-            if item not in merged:
-                merged.append(item)
-        return merged
+        chunks = [operations[start:start + self.write_batch_size] for start in range(0, len(operations), self.write_batch_size)]
+        batch_id = self.journal.write_batch(chunks) if self.journal is not None and chunks else None
+        for chunk in chunks:
+            self._execute_batch(chunk)
+        # Committed before the $inc, so a replayed batch never has its increments applied; a crash
+        # between the two leaves a summary marker, and recovery recounts instead of re-incrementing.
+        if batch_id is not None:
+            self.journal.commit_batch(batch_id, summary_pending=bool(summary_delta))
+        if summary_delta:
+            self._update_summary(summary_delta)
+            if batch_id is not None:
+                self.journal.commit_summary(batch_id)
 
-    def get_os_distribution(self) -> Dict[str, int]:
-        pipeline = [
-            {"$group": {"_id": "$os_version", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
+    def recover(self) -> int:
+        """Re-apply bulk-write chunks the journal logged but never saw acknowledged.
+
+        The replayed operations are idempotent, so chunks that did reach
+        MongoDB before the crash are harmless to send again. A replayed batch
+        never had its summary increments applied, and a batch with a pending
+        summary marker may or may not have, so in either case the counters
+        are recounted rather than incremented. Returns the number of chunks replayed.
+        """
+        pending = self.journal.pending_chunks()
+        for _, _, chunk in pending:
+            self._execute_batch(chunk)
+        for batch_id in dict.fromkeys(batch_id for batch_id, _, _ in pending):
+            self.journal.commit_batch(batch_id)
+        if pending:
+            print(f"Recovered {len(pending)} uncommitted bulk-write chunks from the journal")
+            metrics.increment("journal_replayed_chunks_total", len(pending))
+        stale_summaries = self.journal.pending_summaries()
+        # Without maintain_summary the markers stay, for the next process that keeps the counters.
+        if self.maintain_summary and (pending or stale_summaries):
+            self.rebuild_summary()
+            for batch_id in stale_summaries:
+                self.journal.commit_summary(batch_id)
+        return len(pending)
+
+    def reconcile(self) -> int:
+        """Collapse stored documents that share a match key; returns the documents removed.
+
+        One projection scan finds the clusters, then only their documents are
+        read in full and merged as ``deduplicate_and_merge`` would have.
+        """
+        union_find = UnionFind()
+        owners: Dict[Tuple[str, str], Any] = {}
+        with metrics.timer("reconcile"):
+            for doc in self.hosts_collection.find({}, self.identity_index.projection()):
+                for identity_key in self.identity_index.identity_keys(doc):
+                    owner = owners.setdefault(identity_key, doc["_id"])
+                    if owner != doc["_id"]:
+                        union_find.add(owner)
+                        union_find.add(doc["_id"])
+                        union_find.union(owner, doc["_id"])
+            clusters = [ids for ids in union_find.groups().values() if len(ids) > 1]
+            ids = [doc_id for cluster in clusters for doc_id in cluster]
+            docs: Dict[Any, Dict[str, Any]] = {}
+            for start in range(0, len(ids), self.batch_size):
+                for doc in self.hosts_collection.find({"_id": {"$in": ids[start:start + self.batch_size]}}):
+                    docs[doc["_id"]] = doc
+
+            operations: List[Any] = []
+            for cluster in clusters:
+                primary, *others = sorted((docs[doc_id] for doc_id in cluster if doc_id in docs), key=lambda doc: str(doc["_id"]))
+                merged = primary
+                for other in others:
+                    merged = self._merge_hosts(merged, {k: v for k, v in other.items() if k != "_id"})
+                    operations.append(DeleteOne({"_id": other["_id"]}))
+                if others:
+                    merged[KEYS_FIELD] = self.identity_index.key_fields([merged, *others])
+                    operations.append(ReplaceOne({"_id": merged["_id"]}, merged))
+            for start in range(0, len(operations), self.write_batch_size):
+                self._execute_batch(operations[start:start + self.write_batch_size])
+        removed = sum(isinstance(operation, DeleteOne) for operation in operations)
+        metrics.increment("reconciled_documents_total", removed)
+        if removed:
+            if self.maintain_summary:
+                self.rebuild_summary()
+            if self.identity_index.warm:
+                self.identity_index.warm_load(self.hosts_collection)
+        return removed
+
+    def _find_existing(self, hosts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fetch stored hosts that share an identity key with the batch."""
+        with metrics.timer("mongo_read", op="find_existing"):
+            existing = self._query_existing(hosts)
+        metrics.increment("mongo_documents_read_total", len(existing), op="find_existing")
+        return existing
+
+    def _query_existing(self, hosts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.identity_index.warm:
+            ids = list(self.identity_index.candidates(hosts))
+            return list(self.hosts_collection.find({"_id": {"$in": ids}})) if ids else []
+
+        found: Dict[Any, Dict[str, Any]] = {}
+        for key, values in self.identity_index.lookup_values(hosts).items():
+            for doc in self.hosts_collection.find(self._match_filter(key, values)):
+                found.setdefault(doc["_id"], doc)
+        return list(found.values())
+
+    def stored_ids(self, hosts: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Set[Any]]:
+        """Ids of the stored documents holding each identity key (or alias) of ``hosts``, read with a key-only projection."""
+        found: Dict[Tuple[str, str], Set[Any]] = {}
+        with metrics.timer("mongo_read", op="stored_ids"):
+            for key, values in self.identity_index.lookup_values(hosts).items():
+                for start in range(0, len(values), self.batch_size):
+                    query = self._match_filter(key, values[start:start + self.batch_size])
+                    for doc in self.hosts_collection.find(query, self.identity_index.projection()):
+                        for identity_key in self.identity_index.identity_keys(doc):
+                            found.setdefault(identity_key, set()).add(doc["_id"])
+        return found
+
+    @staticmethod
+    def _match_filter(key: str, values: List[Any]) -> Dict[str, Any]:
+        # The $type clause lets the planner use the partial index on the normalized ``key``.
+        return {f"{KEYS_FIELD}.{key}": {"$in": values, "$type": "string"}}
+
+    def _execute_batch(self, operations: List[Any]) -> None:
+        try:
+            with metrics.timer("mongo_write", op="bulk_write"):
+                self.hosts_collection.bulk_write(operations, ordered=False)
+            if metrics.enabled:
+                for op, count in Counter(type(operation).__name__ for operation in operations).items():
+                    metrics.increment("mongo_write_operations_total", count, op=op)
+        except BulkWriteError as e:
+            metrics.increment("mongo_write_errors_total", len(e.details.get("writeErrors", [])))
+            print(f"Error performing bulk write: {e.details.get('writeErrors')}")
+        self.invalidate_stats()
+
+    def _merge_hosts(self, host1: Dict[str, Any], host2: Dict[str, Any]) -> Dict[str, Any]:
+        return self.merge_engine.merge(host1, host2)
+
+    @staticmethod
+    def _stats_pipeline() -> List[Dict[str, Any]]:
+        """All three distributions in one collection pass."""
+        cutoff = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(days=30)
+        # Bounds of the BSON date range: in aggregation comparisons values of other types
+        # (strings, nulls, missing fields) sort outside it, so only real dates are counted.
+        earliest = datetime.min.replace(tzinfo=pytz.UTC)
+        latest = datetime.max.replace(tzinfo=pytz.UTC)
+        return [
+            {"$project": {"_id": 0, "os_version": 1, "platform": 1, "last_seen": 1}},
+            {"$facet": {
+                "os_distribution": [
+                    {"$group": {"_id": "$os_version", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}},
+                ],
+                "cloud_provider_distribution": [
+                    {"$group": {"_id": "$platform", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1}},
+                ],
+                # Missing or string last_seen values fall in neither bucket.
+                "host_age_distribution": [
+                    {"$group": {
+                        "_id": None,
+                        "old_hosts": {"$sum": {"$cond": [
+                            {"$and": [{"$gte": ["$last_seen", earliest]}, {"$lt": ["$last_seen", cutoff]}]}, 1, 0
+                        ]}},
+                        "new_hosts": {"$sum": {"$cond": [
+                            {"$and": [{"$gte": ["$last_seen", cutoff]}, {"$lte": ["$last_seen", latest]}]}, 1, 0
+                        ]}},
+                    }},
+                ],
+            }},
+        ]
+
+    def aggregate_stats(self) -> Dict[str, Dict[str, int]]:
+        """Compute every distribution with a single ``$facet`` aggregation."""
+        with metrics.timer("mongo_read", op="stats_facet"):
+            result = next(self.hosts_collection.aggregate(self._stats_pipeline()), {})
+        age = (result.get("host_age_distribution") or [{}])[0]
+        return {
+            "os_distribution": {doc["_id"]: doc["count"] for doc in result.get("os_distribution", [])},
+            "host_age_distribution": {name: age.get(name, 0) for name in ("old_hosts", "new_hosts")},
+            "cloud_provider_distribution": {doc["_id"]: doc["count"] for doc in result.get("cloud_provider_distribution", [])},
+        }
+
+    def summary_stats(self) -> Dict[str, Dict[str, int]]:
+        """Read the distributions from the summary counters without touching ``hosts``.
+
+        Host age is resolved to the day: hosts last seen on the cutoff day count as new.
+        """
+        with metrics.timer("mongo_read", op="stats_summary"):
+            counters = list(self.summary_collection.find({"count": {"$gt": 0}}))
+        by_field: Dict[str, List[Tuple[Any, int]]] = {key: [] for key in self.STATS_KEYS}
+        for doc in counters:
+            by_field.setdefault(doc["_id"]["field"], []).append((doc["_id"]["value"], doc["count"]))
+        cutoff_day = (datetime.utcnow() - timedelta(days=30)).strftime("%Y-%m-%d")
+        days = [(day, count) for day, count in by_field["last_seen"] if day is not None]
+        return {
+            "os_distribution": dict(sorted(by_field["os_version"], key=lambda item: -item[1])),
+            "host_age_distribution": {
+                "old_hosts": sum(count for day, count in days if day < cutoff_day),
+                "new_hosts": sum(count for day, count in days if day >= cutoff_day),
+            },
+            "cloud_provider_distribution": dict(sorted(by_field["platform"], key=lambda item: -item[1])),
+        }
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """All distributions, cached for ``stats_ttl`` seconds and dropped on every write."""
+        now = time.monotonic()
+        if self._stats_cache is not None and now - self._stats_cache[0] < self.stats_ttl:
+            return self._stats_cache[1]
+        stats = self.summary_stats() if self.maintain_summary else self.aggregate_stats()
+        self._stats_cache = (now, stats)
+        return stats
+
+    def invalidate_stats(self) -> None:
+        self._stats_cache = None
+
+    def rebuild_summary(self) -> None:
+        """Recount the summary collection from ``hosts`` (e.g. after writes made elsewhere)."""
+        counts: Counter = Counter()
+        for doc in self.hosts_collection.find({}, {key: 1 for key in self.STATS_KEYS}):
+            counts.update(_summary_values(doc))
+        self.summary_collection.delete_many({})
+        if counts:
+            self.summary_collection.insert_many([
+                {"_id": {"field": field, "value": value}, "count": count}
+                for (field, value), count in counts.items()
+            ])
+        self.invalidate_stats()
+
+    def _update_summary(self, delta: Counter) -> None:
+        operations = [
+            UpdateOne({"_id": {"field": field, "value": value}}, {"$inc": {"count": count}}, upsert=True)
+            for (field, value), count in delta.items()
+            if count
         ]
-        result = self.hosts_collection.aggregate(pipeline)
-        return {doc["_id"]: doc["count"] for doc in result}
+        if not operations:
+            return
+        try:
+            with metrics.timer("mongo_write", op="summary"):
+                self.summary_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            print(f"Error updating host summary: {e.details.get('writeErrors')}")
+        self.invalidate_stats()
+
+    def get_os_distribution(self) -> Dict[str, int]:
+        return self.get_stats()["os_distribution"]
 
     def get_host_age_distribution(self) -> Dict[str, int]:
-        thirty_days_ago = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(days=30)
-        old_hosts = self.hosts_collection.count_documents({"last_seen": {"$lt": thirty_days_ago}})
-        new_hosts = self.hosts_collection.count_documents({"last_seen": {"$gte": thirty_days_ago}})
-        return {"old_hosts": old_hosts, "new_hosts": new_hosts}
+        return self.get_stats()["host_age_distribution"]
 
     def get_cloud_provider_distribution(self) -> Dict[str, int]:
-        pipeline = [
-            {"$group": {"_id": "$platform", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        result = self.hosts_collection.aggregate(pipeline)
-        return {doc["_id"]: doc["count"] for doc in result}
+        return self.get_stats()["cloud_provider_distribution"]
+
+    def explain(self) -> Dict[str, Dict[str, Any]]:
+        """Report, for each query this class issues, which index it uses and whether it is covered."""
+        pipelines: Dict[str, List[Dict[str, Any]]] = {"stats_facet": self._stats_pipeline()}
+        for key in self.identity_index.match_keys:
+            pipelines[f"match_{key}"] = [{"$match": self._match_filter(key, ["__explain__"])}]
+
+        report = {}
+        for name, pipeline in pipelines.items():
+            plan = self.db.command("aggregate", self.hosts_collection.name, pipeline=pipeline, explain=True)
+            stages, indexes = _collect_plan(plan)
+            uses_index = bool(stages & {"IXSCAN", "DISTINCT_SCAN", "COUNT_SCAN"})
+            report[name] = {
+                "indexes": sorted(indexes),
+                "uses_index": uses_index,
+                "covered": uses_index and not stages & {"FETCH", "COLLSCAN"},
+                "stages": sorted(stages),
+            }
+        return report
+
+
+def _summary_values(doc: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """The (field, value) counters a stored host contributes to the summary."""
+    last_seen = doc.get("last_seen")
+    return [
+        ("os_version", doc.get("os_version")),
+        ("platform", doc.get("platform")),
+        ("last_seen", last_seen.strftime("%Y-%m-%d") if isinstance(last_seen, datetime) else None),
+    ]
+
+
+def _collect_plan(node: Any) -> Tuple[Set[str], Set[str]]:
+    """Stage and index names in the winning plan(s) of an explain document."""
+    stages: Set[str] = set()
+    indexes: Set[str] = set()
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "rejectedPlans":
+                continue
+            if key == "stage" and isinstance(value, str):
+                stages.add(value)
+            elif key == "indexName" and isinstance(value, str):
+                indexes.add(value)
+            else:
+                child_stages, child_indexes = _collect_plan(value)
+                stages |= child_stages
+                indexes |= child_indexes
+    elif isinstance(node, list):
+        for item in node:
+            child_stages, child_indexes = _collect_plan(item)
+            stages |= child_stages
+            indexes |= child_indexes
+    return stages, indexes
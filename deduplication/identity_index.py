@@ -0,0 +1,190 @@
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_MATCH_KEYS: Tuple[str, ...] = ("hostname", "external_ip", "local_ip", "mac_address")
+
+# Values that many unrelated hosts report and that must never link them together.
+DEFAULT_BLOCKLIST: Set[str] = {
+    "",
+    "none",
+    "null",
+    "unknown",
+    "localhost",
+    "localhost.localdomain",
+    "127.0.0.1",
+    "0.0.0.0",
+    "::1",
+    "00:00:00:00:00:00",
+    "ff:ff:ff:ff:ff:ff",
+}
+
+IdentityKey = Tuple[str, str]
+
+# Stored hosts keep their raw key values; this sub-document holds, per key,
+# every normalized value merged into the host (its aliases), which is what
+# match queries and their multikey indexes use.
+KEYS_FIELD = "_keys"
+
+
+def _normalize_text(value: Any) -> str:
+    return str(value).strip().lower()
+
+
+def _normalize_mac(value: Any) -> str:
+    return _normalize_text(value).replace("-", ":")
+
+
+KEY_NORMALIZERS: Dict[str, Callable[[Any], str]] = {
+    "mac_address": _normalize_mac,
+}
+
+
+class UnionFind:
+    """Disjoint sets with path compression and union by size."""
+
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+        self.size: Dict[Hashable, int] = {}
+
+    def add(self, item: Hashable) -> None:
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item: Hashable) -> Hashable:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def groups(self) -> Dict[Hashable, List[Hashable]]:
+        groups: Dict[Hashable, List[Hashable]] = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return groups
+
+
+class IdentityIndex:
+    """Resolves hosts into identity clusters using normalized match keys.
+
+    Two records belong to the same cluster when they share any non-blocked
+    key value, directly or through a chain of other records. The index can
+    also keep a persistent map of key -> stored document id (see
+    ``warm_load``) so batches can be resolved without per-key queries.
+    """
+
+    def __init__(
+        self,
+        match_keys: Iterable[str] = DEFAULT_MATCH_KEYS,
+        blocklist: Optional[Iterable[str]] = None,
+    ):
+        self.match_keys = tuple(match_keys)
+        self.blocklist = set(DEFAULT_BLOCKLIST if blocklist is None else blocklist)
+        self.owners: Dict[IdentityKey, Any] = {}
+        self.warm = False
+
+    def normalize(self, key: str, value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        normalized = KEY_NORMALIZERS.get(key, _normalize_text)(value)
+        return None if normalized in self.blocklist else normalized
+
+    def identity_keys(self, record: Dict[str, Any]) -> List[IdentityKey]:
+        """Normalized keys of a host, or of a stored document including its ``KEYS_FIELD`` aliases."""
+        aliases = record.get(KEYS_FIELD) or {}
+        keys: List[IdentityKey] = []
+        for key in self.match_keys:
+            stored = aliases.get(key) or []
+            for raw in [record.get(key)] + (stored if isinstance(stored, list) else [stored]):
+                value = self.normalize(key, raw)
+                if value is not None and (key, value) not in keys:
+                    keys.append((key, value))
+        return keys
+
+    def key_fields(self, records: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """The ``KEYS_FIELD`` sub-document of the document merged from ``records``."""
+        values: Dict[str, Set[str]] = {}
+        for record in records:
+            for key, value in self.identity_keys(record):
+                values.setdefault(key, set()).add(value)
+        return {key: sorted(found) for key, found in values.items()}
+
+    def projection(self) -> Dict[str, int]:
+        """Fields ``identity_keys`` reads from a stored document."""
+        return {**{key: 1 for key in self.match_keys}, KEYS_FIELD: 1}
+
+    def lookup_values(self, hosts: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Normalized values per key, for querying ``KEYS_FIELD`` of stored documents."""
+        values: Dict[str, Set[str]] = {key: set() for key in self.match_keys}
+        for host in hosts:
+            for key, value in self.identity_keys(host):
+                values[key].add(value)
+        return {key: list(found) for key, found in values.items() if found}
+
+    def resolve(
+        self, hosts: List[Dict[str, Any]], existing: Iterable[Dict[str, Any]] = ()
+    ) -> List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """Group hosts and stored documents into clusters of (hosts, documents)."""
+        records: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for position, doc in enumerate(existing):
+            records[("doc", position)] = doc
+        for position, host in enumerate(hosts):
+            records[("host", position)] = host
+
+        union_find = UnionFind()
+        first_seen: Dict[IdentityKey, Tuple[str, int]] = {}
+        for node, record in records.items():
+            union_find.add(node)
+            for identity_key in self.identity_keys(record):
+                other = first_seen.setdefault(identity_key, node)
+                if other != node:
+                    union_find.union(node, other)
+
+        clusters = []
+        for members in union_find.groups().values():
+            members.sort()
+            cluster_docs = [records[node] for node in members if node[0] == "doc"]
+            cluster_hosts = [records[node] for node in members if node[0] == "host"]
+            if cluster_hosts:
+                clusters.append((cluster_hosts, cluster_docs))
+        return clusters
+
+    def warm_load(self, collection) -> int:
+        """Populate the key -> document id map with one projection scan."""
+        self.owners.clear()
+        count = 0
+        for doc in collection.find({}, self.projection()):
+            self.register(doc)
+            count += 1
+        self.warm = True
+        return count
+
+    def register(self, doc: Dict[str, Any]) -> None:
+        for identity_key in self.identity_keys(doc):
+            self.owners.setdefault(identity_key, doc["_id"])
+
+    def unregister(self, doc: Dict[str, Any]) -> None:
+        for identity_key in self.identity_keys(doc):
+            if self.owners.get(identity_key) == doc["_id"]:
+                del self.owners[identity_key]
+
+    def candidates(self, hosts: Iterable[Dict[str, Any]]) -> Set[Any]:
+        """Ids of stored documents sharing a key with any of ``hosts``."""
+        found = set()
+        for host in hosts:
+            for identity_key in self.identity_keys(host):
+                doc_id = self.owners.get(identity_key)
+                if doc_id is not None:
+                    found.add(doc_id)
+        return found
@@ -0,0 +1,162 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+from normalizers.timestamps import to_utc
+
+_MISSING = object()
+
+def _sources(doc: Dict[str, Any]) -> List[str]:
+    return [source for source in (doc.get("source") or "").split(",") if source]
+
+class PreferNonNull:
+    """Take the incoming value unless it is null."""
+
+    def merge(self, current: Any, incoming: Any, current_doc: Dict[str, Any], incoming_doc: Dict[str, Any]) -> Any:
+        return incoming if incoming is not None else current
+
+
+class MaxDate:
+    """Keep the later of two dates as a UTC datetime, ignoring missing values."""
+
+    pick = staticmethod(max)
+
+    def merge(self, current: Any, incoming: Any, current_doc: Dict[str, Any], incoming_doc: Dict[str, Any]) -> Optional[datetime]:
+        if current is None:
+            return to_utc(incoming)
+        if incoming is None:
+            return to_utc(current)
+        return self.pick(to_utc(current), to_utc(incoming))
+
+
+class MinDate(MaxDate):
+    """Keep the earlier of two dates."""
+
+    pick = staticmethod(min)
+
+
+class SourceSet:
+    """Comma-separated set of sources; merging a source that is already present is a no-op."""
+
+    def merge(self, current: Any, incoming: Any, current_doc: Dict[str, Any], incoming_doc: Dict[str, Any]) -> Any:
+        merged = ",".join(dict.fromkeys(_sources(current_doc) + _sources(incoming_doc)))
+        return merged or incoming
+
+
+class PreferSource:
+    """Take the value reported by the highest-ranked source in ``order``.
+
+    The incoming value wins when its source ranks at least as high as the
+    best source already merged into the current document, or when the
+    current value is null.
+    """
+
+    def __init__(self, order: Sequence[str]):
+        self.ranks = {source: rank for rank, source in enumerate(order)}
+
+    def _rank(self, doc: Dict[str, Any]) -> int:
+        return min((self.ranks.get(source, len(self.ranks)) for source in _sources(doc)), default=len(self.ranks))
+
+    def merge(self, current: Any, incoming: Any, current_doc: Dict[str, Any], incoming_doc: Dict[str, Any]) -> Any:
+        if incoming is None:
+            return current
+        if current is None or self._rank(incoming_doc) <= self._rank(current_doc):
+            return incoming
+        return current
+
+
+class UnionList:
+    """Union of two lists in a single hash-based pass, keeping first-seen order.
+
+    With ``key``, items are matched on those fields (e.g. ``("port",
+    "protocol")``) and an incoming item replaces the current one with the
+    same key. Without it, or when every key field is null, items are
+    matched on their whole value.
+    """
+
+    def __init__(self, key: Optional[Sequence[str]] = None):
+        self.key = tuple(key) if key else None
+
+    def _identity(self, item: Any) -> Hashable:
+        if self.key is not None and isinstance(item, dict):
+            identity = tuple(item.get(field) for field in self.key)
+            if any(part is not None for part in identity):
+                return identity
+        if isinstance(item, (dict, list)):
+            return json.dumps(item, sort_keys=True, default=str)
+        return item
+
+    def merge(self, current: Any, incoming: Any, current_doc: Dict[str, Any], incoming_doc: Dict[str, Any]) -> Any:
+        if not isinstance(current, list) or not isinstance(incoming, list):
+            return incoming if incoming is not None else current
+        merged = {self._identity(item): item for item in current}
+        for item in incoming:
+            merged[self._identity(item)] = item
+        return list(merged.values())
+
+
+DEFAULT_POLICIES: Dict[str, Any] = {
+    "first_seen": MinDate(),
+    "last_seen": MaxDate(),
+    "source": SourceSet(),
+    "tags": UnionList(),
+    "groups": UnionList(),
+    "network_interfaces": UnionList(key=("mac_address", "ip_address")),
+    "open_ports": UnionList(key=("port", "protocol")),
+    "software": UnionList(key=("name", "version")),
+    "volumes": UnionList(key=("name",)),
+    "vulnerabilities": UnionList(key=("qid",)),
+    "policies": UnionList(key=("policy_type", "policy_id")),
+}
+
+
+class MergeEngine:
+    """Merges host documents field by field according to per-field policies.
+
+    Fields without a policy fall back to ``default`` (prefer non-null).
+    ``update_for`` turns a merge result into a minimal MongoDB update: only
+    changed fields are ``$set``, and union fields that merely grew get an
+    ``$addToSet`` of the new items.
+    """
+
+    def __init__(self, policies: Optional[Dict[str, Any]] = None, default: Any = None):
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.default = default or PreferNonNull()
+
+    def policy(self, field: str) -> Any:
+        return self.policies.get(field, self.default)
+
+    def merge(self, current: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
+        merged = current.copy()
+        for key, value in incoming.items():
+            if key == "_id":
+                continue
+            merged[key] = self.policy(key).merge(current.get(key), value, current, incoming)
+        return merged
+
+    def update_for(self, stored: Dict[str, Any], merged: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """The smallest update turning ``stored`` into ``merged``; empty if nothing changed."""
+        set_fields: Dict[str, Any] = {}
+        add_to_set: Dict[str, Any] = {}
+        for key, value in merged.items():
+            if key == "_id":
+                continue
+            old = stored.get(key, _MISSING)
+            if old == value:
+                continue
+            if (
+                isinstance(self.policy(key), UnionList)
+                and isinstance(old, list)
+                and isinstance(value, list)
+                and len(value) > len(old)
+                and value[:len(old)] == old
+            ):
+                add_to_set[key] = {"$each": value[len(old):]}
+            else:
+                set_fields[key] = value
+        update: Dict[str, Dict[str, Any]] = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if add_to_set:
+            update["$addToSet"] = add_to_set
+        return update
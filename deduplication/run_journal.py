@@ -0,0 +1,321 @@
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import bson
+import pytz
+from pymongo import ASCENDING, DeleteOne, InsertOne, ReplaceOne, UpdateOne
+
+# Page states, in the order a page moves through the pipeline.
+PAGE_STATES = ("fetched", "normalized", "committed")
+
+def encode_operation(op: Any) -> Dict[str, Any]:
+    """Plain-document form of a pymongo write model, for the write-ahead log."""
+    # pymongo keeps the filter and document of its write models in _filter/_doc.
+    if isinstance(op, InsertOne):
+        return {"op": "insert", "doc": op._doc}
+    if isinstance(op, ReplaceOne):
+        return {"op": "replace", "filter": op._filter, "doc": op._doc}
+    if isinstance(op, UpdateOne):
+        return {"op": "update", "filter": op._filter, "doc": op._doc}
+    if isinstance(op, DeleteOne):
+        return {"op": "delete", "filter": op._filter}
+    raise TypeError(f"Cannot journal {type(op).__name__}")
+
+def decode_operation(entry: Dict[str, Any]) -> Any:
+    """Rebuild a write model from ``encode_operation``, made safe to apply twice.
+
+    Inserts become upserting replacements on the same ``_id``, so replaying a
+    batch whose insert already landed does not fail on the duplicate key;
+    replacements, ``$set``/``$addToSet`` updates and deletes are idempotent as is.
+    """
+    kind = entry["op"]
+    if kind == "insert":
+        return ReplaceOne({"_id": entry["doc"]["_id"]}, entry["doc"], upsert=True)
+    if kind == "replace":
+        return ReplaceOne(entry["filter"], entry["doc"])
+    if kind == "update":
+        return UpdateOne(entry["filter"], entry["doc"])
+    return DeleteOne(entry["filter"])
+
+_CODEC_OPTIONS = bson.CodecOptions(tz_aware=True, tzinfo=pytz.UTC)
+
+def _encode_chunk(operations: List[Any]) -> bytes:
+    return bson.encode({"ops": [encode_operation(op) for op in operations]})
+
+def _decode_chunk(data: bytes) -> List[Any]:
+    return [decode_operation(entry) for entry in bson.decode(data, codec_options=_CODEC_OPTIONS)["ops"]]
+
+
+class RunJournal:
+    """Durable progress record of sync runs, for resuming after a crash.
+
+    Keeps two things:
+
+    * per run, the state of every page (fetched, normalized, committed), so a
+      restarted run skips pages whose hosts are already merged;
+    * a write-ahead log of merge batches: the bulk-write chunks of a batch are
+      recorded before the first one is sent and removed once all of them are
+      acknowledged, so batches still logged after a crash are the ones to re-apply;
+    * a marker for every batch whose summary-counter ``$inc`` has not been
+      confirmed, set when its chunks are committed and cleared once the
+      counters are updated, so a crash in between leads to a recount rather
+      than to lost or doubled increments.
+
+    Subclasses provide the storage; see ``SqliteJournal`` and ``MongoJournal``.
+    """
+
+    run_id: Optional[str] = None
+
+    def start_run(self, start_skips: Dict[str, int]) -> Dict[str, int]:
+        """Resume the newest unfinished run, or begin one from ``start_skips``.
+
+        Returns the start skips of the run, which for a resumed run are the
+        ones it was first started with.
+        """
+        run = self._unfinished_run()
+        if run is not None:
+            self.run_id, start_skips = run
+            print(f"Resuming run {self.run_id}")
+        else:
+            self.run_id = uuid.uuid4().hex
+            self._insert_run(start_skips)
+        return dict(start_skips)
+
+    def finish_run(self) -> None:
+        """Mark the current run complete and drop its page records."""
+        if self.run_id is not None:
+            self._finish_run()
+            self.run_id = None
+
+    def record_page(self, source: str, skip: int, page_len: int, state: str) -> None:
+        if self.run_id is not None:
+            self._set_page(source, skip, page_len, PAGE_STATES.index(state))
+
+    def committed_pages(self, source: str) -> Dict[int, int]:
+        """``{skip: page length}`` of the current run's pages whose hosts are persisted."""
+        if self.run_id is None:
+            return {}
+        return self._pages(source, PAGE_STATES.index("committed"))
+
+    def write_batch(self, chunks: List[List[Any]]) -> str:
+        """Log every bulk-write chunk of a merge batch before any of them is sent."""
+        batch_id = uuid.uuid4().hex
+        self._insert_chunks(batch_id, [(index, _encode_chunk(chunk)) for index, chunk in enumerate(chunks)])
+        return batch_id
+
+    def commit_batch(self, batch_id: str, summary_pending: bool = False) -> None:
+        """Drop a batch from the log once all of its chunks are acknowledged.
+
+        With ``summary_pending`` the batch still has summary counters to
+        update; ``commit_summary`` clears that once they are written.
+        """
+        self._delete_batch(batch_id, summary_pending)
+
+    def commit_summary(self, batch_id: str) -> None:
+        self._delete_summary(batch_id)
+
+    def pending_summaries(self) -> List[str]:
+        """Batches whose writes landed but whose summary update may not have."""
+        return self._summaries()
+
+    def pending_chunks(self) -> List[Tuple[str, int, List[Any]]]:
+        """``(batch id, chunk, operations)`` logged but never acknowledged, oldest first."""
+        return [(batch_id, chunk, _decode_chunk(data)) for batch_id, chunk, data in self._chunks()]
+
+    def close(self) -> None:
+        pass
+
+    def _unfinished_run(self) -> Optional[Tuple[str, Dict[str, int]]]:
+        raise NotImplementedError
+
+    def _insert_run(self, start_skips: Dict[str, int]) -> None:
+        raise NotImplementedError
+
+    def _finish_run(self) -> None:
+        raise NotImplementedError
+
+    def _set_page(self, source: str, skip: int, page_len: int, state: int) -> None:
+        raise NotImplementedError
+
+    def _pages(self, source: str, state: int) -> Dict[int, int]:
+        raise NotImplementedError
+
+    def _insert_chunks(self, batch_id: str, chunks: List[Tuple[int, bytes]]) -> None:
+        raise NotImplementedError
+
+    def _delete_batch(self, batch_id: str, summary_pending: bool) -> None:
+        raise NotImplementedError
+
+    def _delete_summary(self, batch_id: str) -> None:
+        raise NotImplementedError
+
+    def _summaries(self) -> List[str]:
+        raise NotImplementedError
+
+    def _chunks(self) -> List[Tuple[str, int, bytes]]:
+        raise NotImplementedError
+
+
+class SqliteJournal(RunJournal):
+    """Journal in a local SQLite file, independent of the MongoDB being written."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY, started_at TEXT, finished_at TEXT, start_skips TEXT
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            run_id TEXT, source TEXT, skip INTEGER, page_len INTEGER, state INTEGER,
+            PRIMARY KEY (run_id, source, skip)
+        );
+        CREATE TABLE IF NOT EXISTS chunks (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, batch_id TEXT, chunk INTEGER, ops BLOB
+        );
+        CREATE TABLE IF NOT EXISTS summaries (batch_id TEXT PRIMARY KEY);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Written from the event loop and from executor threads; one writer at a time.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        # WAL keeps every commit durable across a process crash without an fsync per page.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def _execute(self, sql: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _unfinished_run(self) -> Optional[Tuple[str, Dict[str, int]]]:
+        rows = self._execute(
+            "SELECT run_id, start_skips FROM runs WHERE finished_at IS NULL ORDER BY started_at DESC LIMIT 1"
+        )
+        return (rows[0][0], json.loads(rows[0][1])) if rows else None
+
+    def _insert_run(self, start_skips: Dict[str, int]) -> None:
+        self._execute(
+            "INSERT INTO runs (run_id, started_at, start_skips) VALUES (?, ?, ?)",
+            (self.run_id, datetime.now(pytz.UTC).isoformat(), json.dumps(start_skips)),
+        )
+
+    def _finish_run(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE run_id = ?", (datetime.now(pytz.UTC).isoformat(), self.run_id)
+            )
+            self._conn.execute("DELETE FROM pages WHERE run_id = ?", (self.run_id,))
+
+    def _set_page(self, source: str, skip: int, page_len: int, state: int) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO pages (run_id, source, skip, page_len, state) VALUES (?, ?, ?, ?, ?)",
+            (self.run_id, source, skip, page_len, state),
+        )
+
+    def _pages(self, source: str, state: int) -> Dict[int, int]:
+        rows = self._execute(
+            "SELECT skip, page_len FROM pages WHERE run_id = ? AND source = ? AND state >= ?",
+            (self.run_id, source, state),
+        )
+        return dict(rows)
+
+    def _insert_chunks(self, batch_id: str, chunks: List[Tuple[int, bytes]]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO chunks (batch_id, chunk, ops) VALUES (?, ?, ?)",
+                [(batch_id, chunk, data) for chunk, data in chunks],
+            )
+
+    def _delete_batch(self, batch_id: str, summary_pending: bool) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM chunks WHERE batch_id = ?", (batch_id,))
+            if summary_pending:
+                self._conn.execute("INSERT OR IGNORE INTO summaries (batch_id) VALUES (?)", (batch_id,))
+
+    def _delete_summary(self, batch_id: str) -> None:
+        self._execute("DELETE FROM summaries WHERE batch_id = ?", (batch_id,))
+
+    def _summaries(self) -> List[str]:
+        return [row[0] for row in self._execute("SELECT batch_id FROM summaries")]
+
+    def _chunks(self) -> List[Tuple[str, int, bytes]]:
+        return self._execute("SELECT batch_id, chunk, ops FROM chunks ORDER BY seq")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MongoJournal(RunJournal):
+    """Journal in the ``journal_runs``/``pages``/``chunks``/``summaries`` collections of the pipeline's database."""
+
+    def __init__(self, db):
+        self.runs_collection = db["journal_runs"]
+        self.pages_collection = db["journal_pages"]
+        self.chunks_collection = db["journal_chunks"]
+        self.summaries_collection = db["journal_summaries"]
+        self.pages_collection.create_index([("run_id", ASCENDING), ("source", ASCENDING)])
+        self.chunks_collection.create_index([("batch_id", ASCENDING)])
+
+    def _unfinished_run(self) -> Optional[Tuple[str, Dict[str, int]]]:
+        run = self.runs_collection.find_one({"finished_at": None}, sort=[("started_at", -1)])
+        return (run["_id"], run["start_skips"]) if run else None
+
+    def _insert_run(self, start_skips: Dict[str, int]) -> None:
+        self.runs_collection.insert_one({
+            "_id": self.run_id, "started_at": datetime.now(pytz.UTC), "finished_at": None, "start_skips": start_skips,
+        })
+
+    def _finish_run(self) -> None:
+        self.runs_collection.update_one({"_id": self.run_id}, {"$set": {"finished_at": datetime.now(pytz.UTC)}})
+        self.pages_collection.delete_many({"run_id": self.run_id})
+
+    def _set_page(self, source: str, skip: int, page_len: int, state: int) -> None:
+        self.pages_collection.update_one(
+            {"_id": f"{self.run_id}:{source}:{skip}"},
+            {"$set": {"run_id": self.run_id, "source": source, "skip": skip, "page_len": page_len, "state": state}},
+            upsert=True,
+        )
+
+    def _pages(self, source: str, state: int) -> Dict[int, int]:
+        query = {"run_id": self.run_id, "source": source, "state": {"$gte": state}}
+        return {doc["skip"]: doc["page_len"] for doc in self.pages_collection.find(query, {"skip": 1, "page_len": 1})}
+
+    def _insert_chunks(self, batch_id: str, chunks: List[Tuple[int, bytes]]) -> None:
+        # Operations are stored as BSON bytes: update documents have "$" keys Mongo won't store as fields.
+        logged_at = datetime.now(pytz.UTC)
+        self.chunks_collection.insert_many([
+            {"_id": f"{batch_id}:{chunk}", "batch_id": batch_id, "chunk": chunk, "logged_at": logged_at, "ops": bson.Binary(data)}
+            for chunk, data in chunks
+        ])
+
+    def _delete_batch(self, batch_id: str, summary_pending: bool) -> None:
+        # Marker first: a crash between the two leaves a replay plus a recount, never neither.
+        if summary_pending:
+            self.summaries_collection.update_one({"_id": batch_id}, {"$set": {"_id": batch_id}}, upsert=True)
+        self.chunks_collection.delete_many({"batch_id": batch_id})
+
+    def _delete_summary(self, batch_id: str) -> None:
+        self.summaries_collection.delete_one({"_id": batch_id})
+
+    def _summaries(self) -> List[str]:
+        return [doc["_id"] for doc in self.summaries_collection.find({}, {"_id": 1})]
+
+    def _chunks(self) -> List[Tuple[str, int, bytes]]:
+        return [
+            (doc["batch_id"], doc["chunk"], bytes(doc["ops"]))
+            for doc in self.chunks_collection.find().sort([("logged_at", ASCENDING), ("chunk", ASCENDING)])
+        ]
+
+
+def open_journal(spec: str, db) -> RunJournal:
+    """``"mongodb"`` for a journal in ``db``, otherwise the path of a SQLite file."""
+    if spec == "mongodb":
+        return MongoJournal(db)
+    return SqliteJournal(spec)
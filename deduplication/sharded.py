@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from instrumentation.metrics import metrics
+from normalizers.records import as_documents
+from deduplication.deduplicator import Deduplicator
+from deduplication.run_journal import open_journal
+
+# Deduplicator options that only make sense in the coordinating process; the
+# journal and summary are handed to workers after construction (see _init_worker).
+_COORDINATOR_OPTIONS = ("journal", "maintain_summary", "warm_index", "create_indexes", "background_indexes")
+
+# One Deduplicator (and MongoClient) per worker process, created by _init_worker.
+_worker: Optional[Deduplicator] = None
+
+def _init_worker(
+    mongo_uri: str, db_name: str, options: Dict[str, Any], journal: Optional[str], maintain_summary: bool
+) -> None:
+    global _worker
+    _worker = Deduplicator(mongo_uri, db_name, create_indexes=False, **options)
+    # Set after construction, so journal recovery and summary rebuilds only ever run in the
+    # coordinator; the worker still journals its batches and applies their summary increments.
+    _worker.maintain_summary = maintain_summary
+    if journal is not None:
+        _worker.journal = open_journal(journal, _worker.db)
+
+def _ready(_: Any) -> int:
+    return os.getpid()
+
+def _merge_shard(hosts: List[Dict[str, Any]]) -> int:
+    _worker.deduplicate_and_merge(hosts)
+    return len(hosts)
+
+
+class ShardedDeduplicator:
+    """Runs ``deduplicate_and_merge`` across worker processes.
+
+    Hosts are partitioned by a CRC of their first blocking key, so hosts
+    sharing that key always land in the same shard; each shard is merged by
+    one worker with its own ``MongoClient`` and batch writer. Before
+    partitioning, the stored documents matching the batch are looked up by
+    their normalized keys. Hosts linked to another shard, through any match
+    key or through a stored document that hosts of another shard also
+    match, are held back and merged in this process after the workers
+    finish, and ``Deduplicator.reconcile`` then collapses stored documents
+    that still share a key.
+
+    No stored document is written by two workers, and shards never create
+    the same identity twice. A journal, given as a SQLite path or
+    ``"mongodb"``, is opened by every worker, so their batches are replayed
+    by the next run's recovery like the coordinator's own. The
+    reconciliation scan reads the whole collection, so this suits full
+    syncs of large lists rather than the streaming pipeline's small batches.
+    """
+
+    def __init__(
+        self,
+        mongo_uri: str,
+        db_name: str,
+        workers: Optional[int] = None,
+        blocking_keys: Iterable[str] = ("hostname", "mac_address"),
+        reconcile: bool = True,
+        **options: Any,
+    ):
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.workers = workers or os.cpu_count() or 1
+        self.blocking_keys = tuple(blocking_keys)
+        self.run_reconcile = reconcile
+        self.journal = options.get("journal")
+        if self.workers > 1 and self.journal is not None and not isinstance(self.journal, str):
+            raise ValueError("Worker processes open the journal themselves; pass a SQLite path or \"mongodb\"")
+        # Creates the indexes, replays any journal and merges the held-back hosts.
+        self.deduplicator = Deduplicator(mongo_uri, db_name, **options)
+        self.worker_options = {key: value for key, value in options.items() if key not in _COORDINATOR_OPTIONS}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned, not forked: this process already holds a MongoClient and its threads,
+            # and the pool may be started from an executor thread.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.mongo_uri, self.db_name, self.worker_options, self.journal, self.deduplicator.maintain_summary),
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """Spawn the worker processes ahead of the first merge."""
+        if self.workers > 1:
+            list(self._get_executor().map(_ready, range(self.workers)))
+
+    def shard_of(self, host: Dict[str, Any], position: int) -> int:
+        index = self.deduplicator.identity_index
+        for key in self.blocking_keys:
+            value = index.normalize(key, host.get(key))
+            if value is not None:
+                # crc32 rather than hash(): string hashes differ between processes.
+                return zlib.crc32(value.encode("utf-8")) % self.workers
+        keys = index.identity_keys(host)
+        if keys:
+            return zlib.crc32(f"{keys[0][0]}={keys[0][1]}".encode("utf-8")) % self.workers
+        return position % self.workers
+
+    def partition(self, hosts: List[Dict[str, Any]]) -> Tuple[List[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        """Split hosts into per-worker shards plus the hosts linked across shards."""
+        index = self.deduplicator.identity_index
+        stored = self.deduplicator.stored_ids(hosts)
+        assigned = []
+        for position, host in enumerate(hosts):
+            keys = index.identity_keys(host)
+            # A stored document links the hosts matching it, whichever keys they match it through.
+            links = keys + [("_id", doc_id) for identity_key in keys for doc_id in stored.get(identity_key, ())]
+            assigned.append((self.shard_of(host, position), links))
+        shards_by_link: Dict[Tuple[str, Any], Set[int]] = {}
+        for shard, links in assigned:
+            for link in links:
+                shards_by_link.setdefault(link, set()).add(shard)
+
+        shards: List[List[Dict[str, Any]]] = [[] for _ in range(self.workers)]
+        deferred: List[Dict[str, Any]] = []
+        for host, (shard, links) in zip(hosts, assigned):
+            if any(len(shards_by_link[link]) > 1 for link in links):
+                deferred.append(host)
+            else:
+                shards[shard].append(host)
+        return shards, deferred
+
+    def deduplicate_and_merge(self, hosts: List[Any]) -> None:
+        if self.workers == 1:
+            # A single Deduplicator leaves nothing to reconcile.
+            self.deduplicator.deduplicate_and_merge(hosts)
+            return
+
+        hosts = as_documents(hosts)
+        with metrics.timer("shard_partition"):
+            shards, deferred = self.partition(hosts)
+        metrics.increment("shard_deferred_hosts_total", len(deferred))
+        with metrics.timer("shard_merge"):
+            list(self._get_executor().map(_merge_shard, [shard for shard in shards if shard]))
+
+        deduplicator = self.deduplicator
+        deduplicator.invalidate_stats()
+        if deduplicator.identity_index.warm:
+            deduplicator.identity_index.warm_load(deduplicator.hosts_collection)
+        if deferred:
+            with metrics.timer("shard_deferred_merge"):
+                deduplicator.deduplicate_and_merge(deferred)
+        if self.run_reconcile:
+            self.deduplicator.reconcile()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "ShardedDeduplicator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,75 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+import pytz
+from pymongo import UpdateOne
+from normalizers.records import as_documents
+
+def content_hash(host: Dict[str, Any]) -> str:
+    """Stable digest of a normalized host, ignoring the Mongo ``_id``."""
+    payload = json.dumps(
+        {k: v for k, v in host.items() if k != "_id"}, sort_keys=True, default=str, separators=(",", ":")
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def record_key(host: Dict[str, Any]) -> Optional[str]:
+    """Identifier of a host within its source, used to look up its last stored hash."""
+    identifier = host.get("host_id") or host.get("device_id") or host.get("hostname")
+    if identifier is None:
+        return None
+    return f"{host.get('source')}:{identifier}"
+
+class SyncState:
+    """Per-source checkpoints and per-host content hashes for incremental syncs.
+
+    Checkpoints live in ``sync_checkpoints`` (one document per source) and
+    hashes in ``sync_hashes`` keyed by ``<source>:<host id>``.
+    """
+
+    def __init__(self, db, checkpoints: str = "sync_checkpoints", hashes: str = "sync_hashes"):
+        self.checkpoints_collection = db[checkpoints]
+        self.hashes_collection = db[hashes]
+        # Hashes computed by filter_changed, reused by commit_hashes.
+        self._pending: Dict[str, str] = {}
+
+    def get_checkpoint(self, source: str) -> Dict[str, Any]:
+        return self.checkpoints_collection.find_one({"_id": source}) or {"_id": source, "next_skip": 0}
+
+    def save_checkpoint(self, source: str, next_skip: int, max_last_seen: Optional[datetime] = None) -> None:
+        update: Dict[str, Any] = {
+            "$set": {"next_skip": next_skip, "updated_at": datetime.now(pytz.UTC)},
+        }
+        if max_last_seen is not None:
+            update["$max"] = {"max_last_seen": max_last_seen}
+        self.checkpoints_collection.update_one({"_id": source}, update, upsert=True)
+
+    def filter_changed(self, hosts: List[Any]) -> List[Dict[str, Any]]:
+        """Drop hosts whose content hash matches the one stored for them, in one query."""
+        hosts = as_documents(hosts)
+        keyed = [(record_key(host), content_hash(host), host) for host in hosts]
+        keys = [key for key, _, _ in keyed if key is not None]
+        stored = {}
+        if keys:
+            stored = {
+                doc["_id"]: doc["hash"]
+                for doc in self.hashes_collection.find({"_id": {"$in": keys}}, {"hash": 1})
+            }
+        changed = []
+        for key, digest, host in keyed:
+            if key is None or stored.get(key) != digest:
+                changed.append(host)
+                if key is not None:
+                    self._pending[key] = digest
+        return changed
+
+    def commit_hashes(self, hosts: Iterable[Dict[str, Any]]) -> None:
+        """Record the hashes of hosts that have been persisted."""
+        operations = []
+        for host in hosts:
+            key = record_key(host)
+            if key is not None:
+                digest = self._pending.pop(key, None) or content_hash(host)
+                operations.append(UpdateOne({"_id": key}, {"$set": {"hash": digest}}, upsert=True))
+        if operations:
+            self.hashes_collection.bulk_write(operations, ordered=False)
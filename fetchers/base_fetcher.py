@@ -0,0 +1,135 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import aiohttp
+
+from fetchers.http_client import AdaptiveLimiter, HttpClient
+from fetchers.spool import PageSpool
+from instrumentation.metrics import metrics
+
+class BaseFetcher:
+    """Common request and pagination logic shared by the source fetchers."""
+
+    base_url: str = ""
+    source: str = ""
+
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrency: int = 4,
+        base_url: Optional[str] = None,
+        http_client: Optional[HttpClient] = None,
+        spool: Optional[PageSpool] = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be >= 1, got {max_concurrency}")
+        self.api_key = api_key
+        if base_url is not None:
+            self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.http_client = http_client or HttpClient()
+        self.spool = spool
+        # Per-source in-flight limit; shrinks while the API is throttling us.
+        self.limiter = AdaptiveLimiter(initial=max_concurrency, maximum=max_concurrency)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "token": self.api_key,
+            "accept": "application/json"
+        }
+
+    async def fetch_page(self, session: aiohttp.ClientSession, skip: int = 1, limit: int = 1) -> bytes:
+        """One page's undecoded response body, spooled if a spool is set."""
+        url = f"{self.base_url}?skip={skip}&limit={limit}"
+        with metrics.timer("fetch_request", source=self.source):
+            raw_page = await self.http_client.post_bytes(session, url, self._headers(), self.limiter)
+        if self.spool is not None:
+            await self.spool.write_async(self.source, skip, raw_page)
+        metrics.increment("fetched_bytes_total", len(raw_page), source=self.source)
+        return raw_page
+
+    async def fetch_hosts(self, session: aiohttp.ClientSession, skip: int = 1, limit: int = 1):
+        raw_page = await self.fetch_page(session, skip=skip, limit=limit)
+        with metrics.timer("decode", source=self.source):
+            hosts = self.http_client.decode(raw_page)
+        metrics.increment("fetched_hosts_total", len(hosts), source=self.source)
+        return hosts
+
+    def iter_pages(
+        self,
+        session: aiohttp.ClientSession,
+        skip: int = 0,
+        limit: int = 1,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Walk skip/limit pages and yield them in order.
+
+        Up to ``concurrency`` pages are requested ahead of the consumer, and
+        the walk stops at the first page holding fewer than ``limit`` hosts.
+        """
+        return self._walk(self.fetch_hosts, session, skip, limit, concurrency, lambda page: len(page) < limit, lambda page_skip: False)
+
+    def iter_raw_pages(
+        self,
+        session: aiohttp.ClientSession,
+        skip: int = 0,
+        limit: int = 1,
+        concurrency: Optional[int] = None,
+        last_skip: Optional[Callable[[], Optional[int]]] = None,
+    ) -> AsyncIterator[bytes]:
+        """Like ``iter_pages`` but yields undecoded bodies, for decoding in a worker process.
+
+        A body's host count is only known once it is decoded, so the consumer
+        reports the skip of the first short page through ``last_skip``; no
+        page past it is requested or yielded. Without it, or until the short
+        page is decoded, the walk stops at the first empty page.
+        """
+        def past_last(page_skip: int) -> bool:
+            last = last_skip() if last_skip else None
+            return last is not None and page_skip > last
+
+        return self._walk(self.fetch_page, session, skip, limit, concurrency, lambda page: False, past_last)
+
+    async def _walk(
+        self,
+        fetch: Callable[..., Awaitable[Any]],
+        session: aiohttp.ClientSession,
+        skip: int,
+        limit: int,
+        concurrency: Optional[int],
+        is_last: Callable[[Any], bool],
+        past_last: Callable[[int], bool],
+    ) -> AsyncIterator[Any]:
+        window = concurrency or self.max_concurrency
+        pending: Deque[Tuple[int, asyncio.Task]] = deque()
+        next_skip = skip
+
+        def schedule() -> None:
+            nonlocal next_skip
+            if not past_last(next_skip):
+                pending.append((next_skip, asyncio.ensure_future(fetch(session, skip=next_skip, limit=limit))))
+                next_skip += limit
+
+        try:
+            for _ in range(window):
+                schedule()
+            while pending:
+                page_skip, task = pending.popleft()
+                page = await task
+                if _is_empty(page) or past_last(page_skip):
+                    break
+                yield page
+                if is_last(page):
+                    break
+                schedule()
+        finally:
+            for _, task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*[task for _, task in pending], return_exceptions=True)
+
+
+def _is_empty(page: Any) -> bool:
+    if isinstance(page, bytes):
+        return not page.strip(b" \t\r\n[]")
+    return not page
@@ -0,0 +1,46 @@
+import json
+from typing import Any, Callable, Optional, Union
+
+Decoder = Callable[[Union[bytes, str]], Any]
+
+def _orjson() -> Decoder:
+    import orjson
+    return orjson.loads
+
+def _msgspec() -> Decoder:
+    import msgspec
+    return msgspec.json.Decoder().decode
+
+def _stdlib() -> Decoder:
+    return json.loads
+
+# In order of preference; the first one importable wins.
+DECODERS = {
+    "orjson": _orjson,
+    "msgspec": _msgspec,
+    "json": _stdlib,
+}
+
+def get_decoder(name: Optional[str] = None) -> Decoder:
+    """Return the named JSON decoder, or the fastest one installed."""
+    if name is not None:
+        if name not in DECODERS:
+            raise ValueError(f"Unknown decoder: {name}")
+        return DECODERS[name]()
+    for factory in DECODERS.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+    return json.loads
+
+def available_decoders():
+    """Names of the decoders that can be imported here."""
+    names = []
+    for name, factory in DECODERS.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
@@ -0,0 +1,174 @@
+import asyncio
+import random
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+import aiohttp
+import pytz
+
+from fetchers.decoding import Decoder, get_decoder
+from instrumentation.metrics import metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class AdaptiveLimiter:
+    """Concurrency limit that halves on throttling and creeps back up on success."""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: Optional[int] = None, increase_after: int = 10):
+        self.minimum = minimum
+        self.maximum = maximum or initial
+        self.limit = max(minimum, min(initial, self.maximum))
+        self.increase_after = increase_after
+        self.in_flight = 0
+        self._successes = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the condition binds to the running event loop.
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.increase_after and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.minimum, self.limit // 2)
+        self._successes = 0
+
+
+def _describe(error: Exception) -> str:
+    """Short description of a failed attempt; never the request headers, which carry the API token."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return f"HTTP {error.status} {error.message}".rstrip()
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+class HttpClient:
+    """Session factory and retrying request helper shared by the fetchers.
+
+    Retries 429/5xx responses, connection errors and timeouts with
+    exponential backoff and full jitter, capped at ``backoff_max``. A
+    ``Retry-After`` sent by the server is honored as sent, up to its own
+    cap ``retry_after_max``.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_after_max: float = 600.0,
+        request_timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        limit: int = 100,
+        limit_per_host: int = 16,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300,
+        decoder: Optional[Decoder] = None,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.decode = decoder or get_decoder()
+
+    def create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout, connect=self.connect_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _retry_after(self, value: Optional[str]) -> Optional[float]:
+        """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP date)."""
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - datetime.now(pytz.UTC)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.retry_after_max)
+
+    async def post_json(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, str],
+        limiter: Optional[AdaptiveLimiter] = None,
+    ) -> Any:
+        return self.decode(await self.post_bytes(session, url, headers, limiter))
+
+    async def post_bytes(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, str],
+        limiter: Optional[AdaptiveLimiter] = None,
+    ) -> bytes:
+        """POST with retries and return the raw response body."""
+        limiter = limiter or AdaptiveLimiter()
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with limiter:
+                    async with session.post(url, headers=headers) as response:
+                        if response.status not in RETRY_STATUSES:
+                            try:
+                                response.raise_for_status()
+                            except aiohttp.ClientResponseError as e:
+                                print(f"Error fetching hosts: {e}")
+                                print(f"Response content: {await response.text()}")
+                                raise
+                            body = await response.read()
+                            limiter.on_success()
+                            return body
+                        if response.status == 429:
+                            limiter.on_throttle()
+                        retry_after = self._retry_after(response.headers.get("Retry-After"))
+                        error: Exception = aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message=response.reason or "",
+                            headers=response.headers,
+                        )
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                error = e
+            metrics.increment("http_retries_total", reason=getattr(error, "status", None) or type(error).__name__)
+            if attempt == self.max_retries:
+                raise error
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            print(f"Retrying {url} in {delay:.1f}s after {_describe(error)} (attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
@@ -0,0 +1,142 @@
+import asyncio
+import gzip
+import heapq
+import json
+import threading
+from collections import Counter
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from fetchers.decoding import Decoder, get_decoder
+
+class PageSpool:
+    """Writes fetched pages to a gzip-compressed JSON-lines file.
+
+    Each line is ``{"source": ..., "skip": ..., "hosts": <raw page>}``. The raw
+    response bytes are embedded as-is rather than decoded and re-encoded;
+    newlines can only appear as whitespace between JSON tokens, so folding
+    them into spaces keeps one page per line.
+
+    An existing file is replaced unless ``append`` is set (for a resumed
+    run adding to the pages of the interrupted one); pages spooled twice
+    for the same position are replayed once.
+    """
+
+    def __init__(self, path: str, compresslevel: int = 6, append: bool = False):
+        self.path = path
+        self._file = gzip.open(path, "ab" if append else "wb", compresslevel=compresslevel)
+        self._lock = threading.Lock()
+
+    def write(self, source: str, skip: int, raw_page: bytes) -> None:
+        header = json.dumps({"source": source, "skip": skip})[:-1].encode("utf-8")
+        body = raw_page.replace(b"\r", b" ").replace(b"\n", b" ")
+        with self._lock:
+            self._file.write(header + b', "hosts": ' + body + b"}\n")
+
+    async def write_async(self, source: str, skip: int, raw_page: bytes) -> None:
+        """Compress and write off the event loop."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.write, source, skip, raw_page)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "PageSpool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def iter_spooled_pages(
+    path: str, source: Optional[str] = None, decoder: Optional[Decoder] = None
+) -> Iterator[Tuple[str, int, List[Dict[str, Any]]]]:
+    """Stream ``(source, skip, hosts)`` from a spool file, one line at a time."""
+    decode = decoder or get_decoder()
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = decode(line)
+            if source is None or record["source"] == source:
+                yield record["source"], record["skip"], record["hosts"]
+
+
+def iter_spooled_positions(path: str, source: Optional[str] = None) -> Iterator[Tuple[str, int]]:
+    """Stream ``(source, skip)`` of every spooled page from the line headers, without decoding the hosts."""
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            header, separator, _ = line.partition(b', "hosts": ')
+            if not separator:
+                continue
+            record = json.loads(header + b"}")
+            if source is None or record["source"] == source:
+                yield record["source"], record["skip"]
+
+
+class SpoolFetcher:
+    """Replays one source's pages from a spool file with the BaseFetcher interface."""
+
+    def __init__(self, path: str, source: str, decoder: Optional[Decoder] = None):
+        self.path = path
+        self.source = source
+        self.decoder = decoder
+
+    def iter_hosts(self, skip: int = 0) -> Iterator[Dict[str, Any]]:
+        """Spooled hosts in position order, from the lowest spooled position at or after ``skip``.
+
+        Pages can be spooled out of order (concurrent fetches) or more than
+        once (appended runs); out-of-order pages are held until their turn
+        and a position already replayed is not replayed again. Replay stops
+        with a warning at the first gap between spooled pages.
+        """
+        # Positions of the pages not read yet, so a gap is told apart from a page still to come.
+        unread = Counter(page_skip for _, page_skip in iter_spooled_positions(self.path, self.source))
+        lowest_unread = sorted(unread)
+        position = skip
+        replayed = False
+        ahead: Dict[int, List[Dict[str, Any]]] = {}
+        for _, page_skip, hosts in iter_spooled_pages(self.path, self.source, self.decoder):
+            unread[page_skip] -= 1
+            if page_skip + len(hosts) > position and page_skip not in ahead:
+                ahead[page_skip] = hosts
+            while True:
+                start = next((page_skip for page_skip in ahead if page_skip <= position), None)
+                if start is not None:
+                    page = ahead.pop(start)
+                    yield from page[position - start:]
+                    replayed = replayed or position < start + len(page)
+                    position = max(position, start + len(page))
+                    continue
+                while lowest_unread and not unread[lowest_unread[0]]:
+                    heapq.heappop(lowest_unread)
+                lowest = min(lowest_unread[:1] + list(ahead), default=None)
+                if lowest is None or lowest <= position:
+                    break
+                if replayed:
+                    print(f"Spool {self.path} has no {self.source} hosts at positions {position}-{lowest - 1}; replay stops there")
+                    return
+                position = lowest
+
+    async def iter_pages(self, session: Any = None, skip: int = 0, limit: int = 1, concurrency: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Pages of ``limit`` hosts from ``skip``, whatever page size they were spooled with."""
+        hosts = self.iter_hosts(skip)
+        loop = asyncio.get_event_loop()
+        while True:
+            # Decompression and decoding run on a thread, off the event loop.
+            page = await loop.run_in_executor(None, list, islice(hosts, limit))
+            if page:
+                yield page
+            if len(page) < limit:
+                break
+
+
+def spool_sample_file(sample_path: str, source: str, spool: PageSpool, page_size: int = 100, copies: int = 1) -> int:
+    """Write a JSON array sample (e.g. ``data/qualys_host_data.txt``) into a spool as pages."""
+    with open(sample_path, "rb") as f:
+        hosts = json.loads(f.read())
+    hosts = hosts * copies
+    for skip in range(0, len(hosts), page_size):
+        spool.write(source, skip, json.dumps(hosts[skip:skip + page_size]).encode("utf-8"))
+    return len(hosts)
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import pytz
+
+SAMPLE_PATHS = {
+    "qualys": "data/qualys_host_data.txt",
+    "crowdstrike": "data/croudstrike_host_data.txt",
+}
+
+OS_VERSIONS = [
+    ("Amazon Linux 2", "Linux"),
+    ("Ubuntu 22.04", "Linux"),
+    ("Ubuntu 20.04", "Linux"),
+    ("Red Hat Enterprise Linux 8", "Linux"),
+    ("Windows Server 2019", "Windows"),
+    ("Windows Server 2022", "Windows"),
+    ("macOS 13", "Mac"),
+]
+
+def _iso(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class SyntheticFetcher:
+    """Generates realistic hosts for one source from the samples in ``data/``.
+
+    Host ``i`` of every source is derived from identity ``i`` with a seeded
+    RNG, so runs are reproducible. A CrowdStrike host reuses the identity of
+    Qualys host ``i`` (same hostname, IPs and MAC) with probability
+    ``duplicate_rate``; otherwise it gets an identity of its own. Exposes the
+    same ``fetch_hosts``/``iter_pages`` interface as ``BaseFetcher``.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        total: int,
+        seed: int = 0,
+        duplicate_rate: float = 0.3,
+        sample_path: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ):
+        if source not in SAMPLE_PATHS:
+            raise ValueError(f"Unknown source: {source}")
+        self.source = source
+        self.total = total
+        self.seed = seed
+        self.duplicate_rate = duplicate_rate
+        with open(sample_path or SAMPLE_PATHS[source]) as f:
+            self.samples: List[Dict[str, Any]] = json.load(f)
+        self.now = now or datetime.now(pytz.UTC)
+
+    def _rng(self, number: int, stream: int) -> random.Random:
+        # Integer seeds are much cheaper than string seeds; ``stream`` keeps draws independent.
+        return random.Random(((self.seed << 40) + number) * 4 + stream)
+
+    def _identity(self, number: int) -> Dict[str, Any]:
+        rng = self._rng(number, 0)
+        os_version, platform = OS_VERSIONS[rng.randrange(len(OS_VERSIONS))]
+        local_ip = f"10.{(number >> 16) & 255}.{(number >> 8) & 255}.{number & 255}"
+        return {
+            "id": f"{number:012x}",
+            "hostname": f"ip-{local_ip.replace('.', '-')}-{number}.ec2.internal",
+            "local_ip": local_ip,
+            "external_ip": f"52.{(number >> 16) & 255}.{(number >> 8) & 255}.{number & 255}",
+            "mac": ":".join(f"{rng.randrange(256):02x}" for _ in range(6)),
+            "os_version": os_version,
+            "platform": platform,
+            "first_seen": self.now - timedelta(days=rng.randrange(90, 720)),
+            "last_seen": self.now - timedelta(days=rng.randrange(0, 90), seconds=rng.randrange(86400)),
+        }
+
+    def _identity_number(self, index: int) -> int:
+        if self.source == "qualys":
+            return index
+        return index if self._rng(index, 1).random() < self.duplicate_rate else self.total + index
+
+    def make_host(self, index: int) -> Dict[str, Any]:
+        identity = self._identity(self._identity_number(index))
+        # Shallow copy: nested sample lists (software, vulns, ...) are shared read-only.
+        host = dict(self.samples[index % len(self.samples)])
+        if self.source == "qualys":
+            self._fill_qualys(host, identity, index)
+        else:
+            self._fill_crowdstrike(host, identity, index)
+        return host
+
+    def _fill_qualys(self, host: Dict[str, Any], identity: Dict[str, Any], index: int) -> None:
+        host["_id"] = index
+        host["name"] = host["dnsHostName"] = host["fqdn"] = identity["hostname"]
+        host["address"] = identity["local_ip"]
+        host["os"] = identity["os_version"]
+        host["created"] = _iso(identity["first_seen"])
+        host["agentInfo"] = {
+            **host.get("agentInfo", {}),
+            "agentId": f"qualys-{identity['id']}",
+            "platform": identity["platform"],
+            "lastCheckedIn": {"$date": _iso(identity["last_seen"])},
+        }
+        host["networkInterface"] = {"list": [{"HostAssetInterface": {
+            "interfaceName": "eth0",
+            "macAddress": identity["mac"],
+            "address": identity["local_ip"],
+        }}]}
+        host["sourceInfo"] = {"list": [
+            {"Ec2AssetSourceSimple": {**source["Ec2AssetSourceSimple"], "publicIpAddress": identity["external_ip"]}}
+            if "Ec2AssetSourceSimple" in source else source
+            for source in host.get("sourceInfo", {}).get("list", [])
+        ]}
+
+    def _fill_crowdstrike(self, host: Dict[str, Any], identity: Dict[str, Any], index: int) -> None:
+        device_id = f"cs{identity['id']}{index:08x}"
+        host["_id"] = host["device_id"] = device_id
+        host["hostname"] = identity["hostname"]
+        host["local_ip"] = identity["local_ip"]
+        host["external_ip"] = identity["external_ip"]
+        host["mac_address"] = identity["mac"].replace(":", "-")
+        host["os_version"] = identity["os_version"]
+        host["platform_name"] = identity["platform"]
+        host["first_seen"] = _iso(identity["first_seen"])
+        host["last_seen"] = _iso(identity["last_seen"])
+
+    def page(self, skip: int, limit: int) -> List[Dict[str, Any]]:
+        return [self.make_host(index) for index in range(max(skip, 0), min(skip + limit, self.total))]
+
+    async def fetch_hosts(self, session: Any = None, skip: int = 0, limit: int = 1) -> List[Dict[str, Any]]:
+        return self.page(skip, limit)
+
+    async def iter_pages(self, session: Any = None, skip: int = 0, limit: int = 1, concurrency: Optional[int] = None):
+        while True:
+            page = self.page(skip, limit)
+            if not page:
+                break
+            yield page
+            if len(page) < limit:
+                break
+            skip += limit
+            # Let the other pipeline stages run between pages.
+            await asyncio.sleep(0)
+
+def synthetic_sources(total: int, seed: int = 0, duplicate_rate: float = 0.3) -> Tuple["SyntheticFetcher", "SyntheticFetcher"]:
+    """A Qualys and a CrowdStrike fetcher sharing identities at ``duplicate_rate``."""
+    now = datetime.now(pytz.UTC)
+    return (
+        SyntheticFetcher("qualys", total, seed=seed, duplicate_rate=duplicate_rate, now=now),
+        SyntheticFetcher("crowdstrike", total, seed=seed, duplicate_rate=duplicate_rate, now=now),
+    )
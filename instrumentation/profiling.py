@@ -0,0 +1,84 @@
+import cProfile
+import io
+import pstats
+import threading
+from typing import Any, Optional
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+class StageProfiler:
+    """Profiles every run of a single instrumented stage.
+
+    Attach with ``metrics.enable(profiler=StageProfiler("normalize"))``;
+    each ``metrics.timer("normalize", ...)`` block then runs under the
+    profiler, and the samples accumulate until ``write`` is called.
+    ``pyinstrument`` is imported only when selected.
+
+    Profilers are switched on and off per thread, so nesting is tracked per
+    thread and the session is owned by one thread at a time: blocks that
+    start on another thread while it is profiling (e.g. the pipeline's
+    writer thread) run unprofiled and are counted in ``skipped``.
+    """
+
+    def __init__(self, stage: str, kind: str = "cprofile"):
+        if kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {kind}")
+        self.stage = stage
+        self.kind = kind
+        self.skipped = 0
+        self._local = threading.local()
+        self._owner: Optional[int] = None
+        self._lock = threading.Lock()
+        if kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler: Any = Profiler(async_mode="disabled")
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        local = self._local
+        local.depth = getattr(local, "depth", 0) + 1
+        if local.depth > 1:
+            return
+        with self._lock:
+            local.active = self._owner is None
+            if not local.active:
+                self.skipped += 1
+                return
+            self._owner = threading.get_ident()
+            if self.kind == "pyinstrument":
+                self._profiler.start()
+            else:
+                self._profiler.enable()
+
+    def stop(self) -> None:
+        local = self._local
+        local.depth -= 1
+        if local.depth > 0 or not local.active:
+            return
+        with self._lock:
+            if self.kind == "pyinstrument":
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+            self._owner = None
+            local.active = False
+
+    def report(self, limit: int = 30) -> str:
+        """Human-readable summary of the captured profile."""
+        if self.kind == "pyinstrument":
+            return self._profiler.output_text()
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def write(self, path: str) -> str:
+        """Save the profile: pstats data for cProfile, an HTML report for pyinstrument."""
+        if self.kind == "pyinstrument":
+            path = f"{path}.html"
+            with open(path, "w") as f:
+                f.write(self._profiler.output_html())
+        else:
+            path = f"{path}.prof"
+            self._profiler.dump_stats(path)
+        return path
@@ -1,21 +1,73 @@
 import asyncio
-from typing import Optional, List, Dict, Any
+import os
+from typing import Optional, List, Dict, Any, Tuple
 from fetchers.qualys_fetcher import QualysFetcher
 from fetchers.crowdstrike_fetcher import CrowdstrikeFetcher
 from normalizers.normalizer import Normalizer
+from normalizers.parallel_normalizer import ParallelNormalizer
+from normalizers.schema import SchemaNormalizer
+from deduplication.async_deduplicator import AsyncDeduplicator
 from deduplication.deduplicator import Deduplicator
+from deduplication.sharded import ShardedDeduplicator
+from fetchers.http_client import HttpClient
+from fetchers.spool import PageSpool, SpoolFetcher
 from visualizer.visualizer import Visualizer
+from pipeline.streaming import PipelineConfig, StreamingPipeline, format_report
+from analytics.export import export_hosts
+from instrumentation.metrics import metrics
+from instrumentation.profiling import StageProfiler
 import aiohttp
 
-async def fetch_hosts(fetcher, session, skip: Optional[int], limit: Optional[int]):
+# Pages are fetched as undecoded bodies so the ParallelNormalizer's workers decode them.
+async def fetch_page(fetcher, session, normalizer, skip: Optional[int], limit: Optional[int]) -> List[Dict[str, Any]]:
     try:
-        return await fetcher.fetch_hosts(session, skip=skip, limit=limit)
-    except aiohttp.ClientResponseError as e:
+        page = await fetcher.fetch_page(session, skip=skip, limit=limit)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         print(f"Error fetching hosts: {e}")
         return []
+    return await normalizer.normalize_page_async(page, fetcher.source)
 
-async def fetch_all_hosts(fetchers, session, skip: Optional[int], limit: Optional[int]):
-    tasks = [fetch_hosts(fetcher, session, skip, limit) for fetcher in fetchers]
+async def fetch_all_pages(
+    fetcher, session, normalizer, skip: int, limit: int, concurrency: Optional[int]
+) -> List[Dict[str, Any]]:
+    # Each page is normalized as it arrives; the first one decoding to a short page ends the walk.
+    normalizing: List[Tuple[int, asyncio.Future]] = []
+
+    def last_skip() -> Optional[int]:
+        return min((
+            page_skip for page_skip, future in normalizing
+            if future.done() and not future.exception() and len(future.result()) < limit
+        ), default=None)
+
+    position = skip
+    try:
+        async for page in fetcher.iter_raw_pages(
+            session, skip=skip, limit=limit, concurrency=concurrency, last_skip=last_skip
+        ):
+            future = asyncio.ensure_future(normalizer.normalize_page_async(page, fetcher.source))
+            normalizing.append((position, future))
+            if not normalizer.pooled:
+                # Normalized in this process anyway; finishing it now lets a short page stop the walk.
+                await future
+            position += limit
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Error fetching hosts: {e}")
+    pages = await asyncio.gather(*[future for _, future in normalizing])
+    return [host for page in pages for host in page]
+
+async def fetch_all_hosts(
+    fetchers,
+    session,
+    normalizer,
+    skip: Optional[int],
+    limit: Optional[int],
+    paginate: bool = False,
+    concurrency: Optional[int] = None,
+):
+    if paginate:
+        tasks = [fetch_all_pages(fetcher, session, normalizer, skip or 0, limit or 1, concurrency) for fetcher in fetchers]
+    else:
+        tasks = [fetch_page(fetcher, session, normalizer, skip, limit) for fetcher in fetchers]
     return await asyncio.gather(*tasks)
 
 async def main(
@@ -24,41 +76,139 @@ async def main(
     db_url: str = "",
     db: str = "",
     api_key: str = "",
+    paginate: bool = False,
+    concurrency: int = 4,
+    streaming: bool = False,
+    pipeline_config: Optional[PipelineConfig] = None,
+    normalize_processes: int = 1,
+    normalizer_schema: Optional[str] = None,
+    incremental: bool = False,
+    spool_path: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    render_processes: int = 1,
+    export_dir: Optional[str] = None,
+    metrics_dir: Optional[str] = None,
+    profile_stage: Optional[str] = None,
+    profiler: str = "cprofile",
+    journal: Optional[str] = None,
+    dedup_processes: int = 1,
 ) -> None:
 
-    qualys_fetcher = QualysFetcher(api_key)
-    crowdstrike_fetcher = CrowdstrikeFetcher(api_key)
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        metrics.enable(profiler=StageProfiler(profile_stage, profiler) if profile_stage else None)
+    try:
+        http_client = HttpClient()
+        # Keep every fetched page on disk so later runs can replay it with replay_path;
+        # a journaled run may be resuming, so it adds to the spool instead of replacing it.
+        spool = PageSpool(spool_path, append=journal is not None) if spool_path else None
+        qualys_fetcher = QualysFetcher(api_key, max_concurrency=concurrency, http_client=http_client, spool=spool)
+        crowdstrike_fetcher = CrowdstrikeFetcher(api_key, max_concurrency=concurrency, http_client=http_client, spool=spool)
+
+        if replay_path:
+            source_fetchers = {source: SpoolFetcher(replay_path, source) for source in ("qualys", "crowdstrike")}
+        else:
+            source_fetchers = {"qualys": qualys_fetcher, "crowdstrike": crowdstrike_fetcher}
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            fetchers = [qualys_fetcher, crowdstrike_fetcher]
-            qualys_hosts, crowdstrike_hosts = await fetch_all_hosts(fetchers, session, skip, limit)
-        except Exception as e:
-            print(f"Error fetching hosts: {e}")
+        if streaming or replay_path:
+            try:
+                deduplicator = await run_streaming(
+                    source_fetchers,
+                    http_client,
+                    db_url,
+                    db,
+                    pipeline_config or PipelineConfig(
+                        fetch_concurrency=concurrency,
+                        normalize_processes=normalize_processes,
+                        normalizer_schema=normalizer_schema,
+                        incremental=incremental,
+                    ),
+                    journal=journal,
+                )
+            finally:
+                if spool is not None:
+                    spool.close()
+            if export_dir:
+                export_inventory(deduplicator, export_dir)
+            await visualize(deduplicator, render_processes)
             return
 
-    # Normalize common data for qualys and crowdstrike
-    normalizer = Normalizer()
-    normalized_qualys_hosts: List[Dict[str, Any]] = normalizer.normalize_hosts(qualys_hosts, "qualys")
-    normalized_crowdstrike_hosts: List[Dict[str, Any]] = normalizer.normalize_hosts(crowdstrike_hosts, "crowdstrike")
-    # import pdb; pdb.set_trace();
+        # A journal replays merge batches a crashed run left half-written before anything else.
+        sharded = ShardedDeduplicator(db_url, db, workers=dedup_processes, journal=journal)
+        deduplicator = sharded.deduplicator
+
+        # Fetch and normalize common data for qualys and crowdstrike
+        normalizer_cls = normalizer_for(normalizer_schema, deduplicator)
+        with ParallelNormalizer(workers=normalize_processes, normalizer_cls=normalizer_cls) as normalizer:
+            async with http_client.create_session() as session:
+                try:
+                    fetchers = [qualys_fetcher, crowdstrike_fetcher]
+                    normalized_qualys_hosts, normalized_crowdstrike_hosts = await fetch_all_hosts(
+                        fetchers, session, normalizer, skip, limit, paginate=paginate, concurrency=concurrency
+                    )
+                except Exception as e:
+                    print(f"Error fetching hosts: {e}")
+                    sharded.close()
+                    return
+                finally:
+                    if spool is not None:
+                        spool.close()
+        # import pdb; pdb.set_trace();
 
-    # Deduplicate and merge hosts
-    deduplicator = Deduplicator(db_url, db)
-    all_hosts: List[Dict[str, Any]] = normalized_qualys_hosts + normalized_crowdstrike_hosts
-    deduplicator.deduplicate_and_merge(all_hosts)
+        # Deduplicate and merge hosts
+        all_hosts: List[Dict[str, Any]] = normalized_qualys_hosts + normalized_crowdstrike_hosts
+        with sharded:
+            # Blocking pymongo work, kept off the event loop.
+            await asyncio.get_event_loop().run_in_executor(None, sharded.deduplicate_and_merge, all_hosts)
 
+        if export_dir:
+            export_inventory(deduplicator, export_dir)
+        await visualize(deduplicator, render_processes)
+    finally:
+        if metrics_dir:
+            export_metrics(metrics_dir)
+
+
+async def run_streaming(
+    fetchers, http_client: HttpClient, db_url: str, db: str, config: PipelineConfig, journal: Optional[str] = None
+) -> Deduplicator:
+    deduplicator = Deduplicator(db_url, db, journal=journal)
+    normalizer_cls = normalizer_for(config.normalizer_schema, deduplicator)
+    with ParallelNormalizer(
+        workers=config.normalize_processes, normalizer_cls=normalizer_cls, compact=config.compact_records
+    ) as normalizer:
+        pipeline = StreamingPipeline(fetchers, normalizer, deduplicator, config, journal=deduplicator.journal)
+        async with http_client.create_session() as session:
+            stats = await pipeline.run(session)
+    print(format_report(stats))
+    return deduplicator
+
+def normalizer_for(schema: Optional[str], deduplicator: Deduplicator):
+    """The compiled mapper for ``schema``, checked against the Deduplicator; the hand-written Normalizer otherwise."""
+    if schema is None:
+        return Normalizer
+    return SchemaNormalizer(schema, required=deduplicator.required_fields())
+
+def export_inventory(deduplicator: Deduplicator, export_dir: str) -> None:
+    # Columnar copy of the merged hosts for analytics outside MongoDB.
+    counts = export_hosts(deduplicator.hosts_collection, export_dir)
+    print(f"Exported {counts['hosts']} hosts to {export_dir}")
+
+def export_metrics(metrics_dir: str) -> None:
+    metrics.write_json(os.path.join(metrics_dir, "metrics.json"))
+    metrics.write_prometheus(os.path.join(metrics_dir, "metrics.prom"))
+    if metrics.profiler is not None:
+        path = metrics.profiler.write(os.path.join(metrics_dir, f"profile_{metrics.profiler.stage}"))
+        print(f"Profile of stage {metrics.profiler.stage!r} written to {path}")
+    print(f"Metrics written to {metrics_dir}")
+
+async def visualize(deduplicator: Deduplicator, render_processes: int = 1) -> None:
     # Generate visualizations asynchronously
-    visualizer = Visualizer(output_dir="output")
-    
-    os_distribution = deduplicator.get_os_distribution()
-    host_age_distribution = deduplicator.get_host_age_distribution()
-    cloud_provider_distribution = deduplicator.get_cloud_provider_distribution()
-    # import pdb; pdb.set_trace();
+    with Visualizer(output_dir="output", workers=render_processes) as visualizer, AsyncDeduplicator(deduplicator) as store:
+        stats = await store.get_stats()
+        # import pdb; pdb.set_trace();
 
-    visualizer.visualize_os_distribution(os_distribution)
-    visualizer.visualize_host_age_distribution(host_age_distribution)
-    visualizer.visualize_cloud_provider_distribution(cloud_provider_distribution)
+        await visualizer.render_async(visualizer.distribution_charts(stats))
 
 if __name__ == "__main__":
     print(
@@ -77,6 +227,31 @@ if __name__ == "__main__":
         "db_url": "mongodb://127.0.0.1:27017/",
         "db": "silk_db",
         "api_key": "***********************************",
+        "paginate": False,
+        "concurrency": 4,
+        "streaming": False,
+        "pipeline_config": PipelineConfig(
+            page_size=100,
+            fetch_concurrency=4,
+            raw_queue_size=8,
+            normalized_queue_size=8,
+            merge_batch_size=1000,
+            normalizer_schema="standard",
+            incremental=False,
+        ),
+        "normalize_processes": 1,
+        "normalizer_schema": "standard",
+        "incremental": False,
+        "spool_path": None,
+        "replay_path": None,
+        "render_processes": 1,
+        "export_dir": None,
+        "metrics_dir": None,
+        "profile_stage": None,
+        "profiler": "cprofile",
+        # SQLite file (or "mongodb") recording run progress, so a crashed run resumes where it stopped.
+        "journal": None,
+        "dedup_processes": 1,
     }
     
     asyncio.run(main(**kwargs))
@@ -1,6 +1,21 @@
 from typing import Dict, Any, List
-from datetime import datetime
 import pdb
+from instrumentation.metrics import metrics
+from normalizers.timestamps import to_utc
+
+def _convert_number_long(obj):
+    if isinstance(obj, dict):
+        new_dict = {}
+        for k, v in obj.items():
+            if k == '$numberLong':
+                return int(v)
+            else:
+                new_key = k[1:] if k.startswith('$') else k
+                new_dict[new_key] = _convert_number_long(v)
+        return new_dict
+    elif isinstance(obj, list):
+        return [_convert_number_long(item) for item in obj]
+    return obj
 
 class Normalizer:
     @staticmethod
@@ -9,25 +24,11 @@ class Normalizer:
         ec2_info = next((source['Ec2AssetSourceSimple'] for source in host.get('sourceInfo', {}).get('list', []) 
                          if 'Ec2AssetSourceSimple' in source), {})
 
-        def convert_number_long(obj):
-            if isinstance(obj, dict):
-                new_dict = {}
-                for k, v in obj.items():
-                    if k == '$numberLong':
-                        return int(v)
-                    else:
-                        new_key = k[1:] if k.startswith('$') else k
-                        new_dict[new_key] = convert_number_long(v)
-                return new_dict
-            elif isinstance(obj, list):
-            	return [convert_number_long(item) for item in obj]
-            return obj
-
         volumes = [
             {
                 "name": volume["HostAssetVolume"].get("name"),
-                "size": convert_number_long(volume["HostAssetVolume"].get("size")),
-                "free": convert_number_long(volume["HostAssetVolume"].get("free")),
+                "size": _convert_number_long(volume["HostAssetVolume"].get("size")),
+                "free": _convert_number_long(volume["HostAssetVolume"].get("free")),
             }
             for volume in host.get("volume", {}).get("list", [])
         ]
@@ -40,7 +41,7 @@ class Normalizer:
             "hostname": host.get("name") or host.get("dnsHostName") or host.get("fqdn"),
             "ip_address": host.get("address"),
             "os": host.get("os"),
-            "last_seen": datetime.fromisoformat(host["lastVulnScan"]["$date"].rstrip("Z")),
+            "last_seen": to_utc(host["lastVulnScan"]),
             "source": "qualys",
             "cloud_provider": host.get("cloudProvider"),
             "manufacturer": host.get("manufacturer"),
@@ -97,8 +98,8 @@ class Normalizer:
             "ip_address": host.get("local_ip"),
             "external_ip": host.get("external_ip"),
             "os": host.get("os_version"),
-            "last_seen": datetime.fromisoformat(host["last_seen"].rstrip('Z')),
-            "first_seen": datetime.fromisoformat(host["first_seen"].rstrip('Z')),
+            "last_seen": to_utc(host["last_seen"]),
+            "first_seen": to_utc(host["first_seen"]),
             "source": "crowdstrike",
             "device_id": host.get("device_id"),
             "cid": host.get("cid"),
@@ -123,14 +124,17 @@ class Normalizer:
 
     @classmethod
     def normalize_hosts(cls, hosts: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
-        if source == "qualys":
-            # print(hosts)
-            # import pdb; pdb.set_trace()
-            return [cls.normalize_qualys_host(host) for host in hosts]
+        with metrics.timer("normalize", source=source):
+            if source == "qualys":
+                # print(hosts)
+                # import pdb; pdb.set_trace()
+                normalized_hosts = [cls.normalize_qualys_host(host) for host in hosts]
 
-        elif source == "crowdstrike":
-            # print(hosts)
-            # import pdb; pdb.set_trace()
-            return [cls.normalize_crowdstrike_host(host) for host in hosts]
-        else:
-            raise ValueError(f"Unknown source: {source}")
\ No newline at end of file
+            elif source == "crowdstrike":
+                # print(hosts)
+                # import pdb; pdb.set_trace()
+                normalized_hosts = [cls.normalize_crowdstrike_host(host) for host in hosts]
+            else:
+                raise ValueError(f"Unknown source: {source}")
+        metrics.increment("normalized_hosts_total", len(normalized_hosts), source=source)
+        return normalized_hosts
\ No newline at end of file
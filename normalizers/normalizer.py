@@ -1,26 +1,8 @@
 from typing import Dict, Any, List
-from datetime import datetime
-import pytz
+from instrumentation.metrics import metrics
+from normalizers.timestamps import try_to_utc
 
 class Normalizer:
-    @staticmethod
-    def _convert_to_iso(date_value: Any) -> str:
-        """Convert various date formats to ISO 8601 format with UTC timezone."""
-        if isinstance(date_value, str):
-            try:
-                date_value = datetime.fromisoformat(date_value.rstrip('Z')).replace(tzinfo=pytz.UTC)
-            except ValueError:
-                try:
-                    date_value = datetime.strptime(date_value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=pytz.UTC)
-                except ValueError:
-                    print(f"Invalid date format: {date_value}")
-                    return date_value
-        elif isinstance(date_value, datetime):
-            return date_value.astimezone(pytz.UTC).isoformat()
-        elif isinstance(date_value, (int, float)):
-            return datetime.fromtimestamp(date_value, pytz.UTC).isoformat()
-        return date_value.astimezone(pytz.UTC).isoformat() + 'Z'
-
     @staticmethod
     def normalize_qualys_host(host: Dict[str, Any]) -> Dict[str, Any]:
         ec2_info = next((source['Ec2AssetSourceSimple'] for source in host.get('sourceInfo', {}).get('list', []) 
@@ -35,10 +17,11 @@ class Normalizer:
             "os_version": host.get("os"),
             "cpu": host.get("processor", {}).get("list", [{}])[0].get("HostAssetProcessor", {}).get("name"),
             "status": host.get("agentInfo", {}).get("status"),
-            "first_seen": Normalizer._convert_to_iso(host.get("created")),
-            "last_seen": Normalizer._convert_to_iso(host.get("agentInfo", {}).get("lastCheckedIn", {}).get("$date")),#Normalizer._convert_to_iso(host.get("modified")),
-            # "last_checked_in": Normalizer._convert_to_iso(host.get("agentInfo", {}).get("lastCheckedIn", {}).get("$date")),
+            "first_seen": try_to_utc(host.get("created")),
+            "last_seen": try_to_utc(host.get("agentInfo", {}).get("lastCheckedIn", {}).get("$date")),#try_to_utc(host.get("modified")),
+            # "last_checked_in": try_to_utc(host.get("agentInfo", {}).get("lastCheckedIn", {}).get("$date")),
             "tags": [tag["TagSimple"].get("name") for tag in host.get("tags", {}).get("list", [])],
+            "source": "qualys",
         }
 
     @staticmethod
@@ -53,19 +36,21 @@ class Normalizer:
             "os_version": host.get("os_version"),
             "cpu": host.get("cpu_signature"),
             "status": host.get("status"),
-            "first_seen": Normalizer._convert_to_iso(host.get("first_seen")),
-            "last_seen": Normalizer._convert_to_iso(host.get("last_seen")),
-            # "last_checked_in": Normalizer._convert_to_iso(host.get("agent_local_time")),
+            "first_seen": try_to_utc(host.get("first_seen")),
+            "last_seen": try_to_utc(host.get("last_seen")),
+            # "last_checked_in": try_to_utc(host.get("agent_local_time")),
             "tags": host.get("tags", []),
+            "source": "crowdstrike",
         }
 
     @classmethod
     def normalize_hosts(cls, hosts: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
-        if source == "qualys":
-            normalized_hosts = [cls.normalize_qualys_host(host) for host in hosts]
-        elif source == "crowdstrike":
-            normalized_hosts = [cls.normalize_crowdstrike_host(host) for host in hosts]
-        else:
-            raise ValueError(f"Unknown source: {source}")
-        
+        with metrics.timer("normalize", source=source):
+            if source == "qualys":
+                normalized_hosts = [cls.normalize_qualys_host(host) for host in hosts]
+            elif source == "crowdstrike":
+                normalized_hosts = [cls.normalize_crowdstrike_host(host) for host in hosts]
+            else:
+                raise ValueError(f"Unknown source: {source}")
+        metrics.increment("normalized_hosts_total", len(normalized_hosts), source=source)
         return normalized_hosts
@@ -0,0 +1,103 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Any, Dict, List, Optional, Type, Union
+
+from fetchers.decoding import get_decoder
+from instrumentation.metrics import metrics
+from normalizers.normalizer import Normalizer
+from normalizers.records import compact_hosts
+
+def _normalize_chunk(normalizer_cls: Type, hosts: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
+    return normalizer_cls.normalize_hosts(hosts, source)
+
+def _normalize_payload(normalizer_cls: Type, payload: Union[bytes, str], source: str) -> List[Dict[str, Any]]:
+    return normalizer_cls.normalize_hosts(get_decoder()(payload), source)
+
+class ParallelNormalizer:
+    """Shards host normalization across worker processes.
+
+    Decoded hosts are sent to workers in chunks of ``chunk_size`` to
+    amortize pickling, and results come back in input order; inputs smaller
+    than ``min_parallel`` are normalized in-process, where the pool would
+    only add overhead. Decoded dicts are expensive to pickle, so when the
+    raw JSON pages are at hand ``normalize_pages`` and
+    ``normalize_page_async`` ship the bytes instead and let each worker
+    decode its own page.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        chunk_size: int = 256,
+        min_parallel: int = 2000,
+        normalizer_cls: Type = Normalizer,
+        compact: bool = False,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_parallel = min_parallel
+        self.normalizer_cls = normalizer_cls
+        # Records are compacted in this process: the _MISSING sentinel does not survive pickling.
+        self.compact = compact
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pooled(self) -> bool:
+        """Whether raw pages are worth sending here rather than decoding them in the fetcher."""
+        return self.workers > 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _chunks(self, hosts: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        return [hosts[start:start + self.chunk_size] for start in range(0, len(hosts), self.chunk_size)]
+
+    def _finish(self, hosts: List[Dict[str, Any]]) -> List[Any]:
+        return compact_hosts(hosts) if self.compact else hosts
+
+    def normalize_hosts(self, hosts: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
+        if not self.pooled or len(hosts) < self.min_parallel:
+            return self._finish(self.normalizer_cls.normalize_hosts(hosts, source))
+        chunks = self._chunks(hosts)
+        with metrics.timer("normalize_pool", source=source):
+            results = list(chain.from_iterable(self._get_executor().map(
+                _normalize_chunk, [self.normalizer_cls] * len(chunks), chunks, [source] * len(chunks)
+            )))
+        return self._finish(results)
+
+    def normalize_pages(self, pages: List[Union[bytes, str]], source: str) -> List[Dict[str, Any]]:
+        """Decode and normalize raw JSON pages, one page per worker task."""
+        if not self.pooled or len(pages) < 2:
+            return self._finish(list(chain.from_iterable(
+                _normalize_payload(self.normalizer_cls, page, source) for page in pages
+            )))
+        with metrics.timer("normalize_pool", source=source):
+            results = list(chain.from_iterable(self._get_executor().map(
+                _normalize_payload, [self.normalizer_cls] * len(pages), pages, [source] * len(pages)
+            )))
+        return self._finish(results)
+
+    async def normalize_page_async(self, page: Union[bytes, str], source: str) -> List[Dict[str, Any]]:
+        """Decode and normalize one raw page on a worker, awaiting it instead of blocking the event loop."""
+        if not self.pooled:
+            return self._finish(_normalize_payload(self.normalizer_cls, page, source))
+        with metrics.timer("normalize_pool", source=source):
+            hosts = await asyncio.get_event_loop().run_in_executor(
+                self._get_executor(), _normalize_payload, self.normalizer_cls, page, source
+            )
+        return self._finish(hosts)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "ParallelNormalizer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,122 @@
+import sys
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List
+
+NetworkInterface = namedtuple("NetworkInterface", "name mac_address ip_address")
+OpenPort = namedtuple("OpenPort", "port protocol service")
+Software = namedtuple("Software", "name version")
+Vulnerability = namedtuple("Vulnerability", "qid first_found last_found")
+Volume = namedtuple("Volume", "name size free")
+
+# Nested list fields stored as tuples of the record type above.
+SUB_RECORDS = {
+    "network_interfaces": NetworkInterface,
+    "open_ports": OpenPort,
+    "software": Software,
+    "volumes": Volume,
+    "vulnerabilities": Vulnerability,
+}
+
+# Low-cardinality values repeated across many hosts; one shared copy each.
+INTERNED_FIELDS = {
+    "source", "os", "os_version", "platform", "platform_name", "status", "cloud_provider",
+    "manufacturer", "model", "cpu", "agent_version", "bios_manufacturer", "bios_version",
+    "service_provider", "system_manufacturer", "system_product_name", "kernel_version",
+    "zone_group", "ec2_instance_type", "ec2_region", "ec2_availability_zone",
+}
+INTERNED_SUB_FIELDS = {"name", "version", "protocol", "service"}
+STRING_LIST_FIELDS = {"tags", "groups"}
+
+_MISSING = object()
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _compact_item(record_type, item: Dict[str, Any]):
+    return record_type._make(
+        _intern(item.get(field)) if field in INTERNED_SUB_FIELDS else item.get(field)
+        for field in record_type._fields
+    )
+
+
+class CompactHost:
+    """Slotted, interned stand-in for a normalized host dict.
+
+    Only ``to_document`` produces a plain dict again, so a large batch of
+    hosts can be held as records and expanded one batch at a time where it
+    is written to MongoDB.
+    """
+
+    __slots__ = (
+        "host_id", "hostname", "external_ip", "local_ip", "ip_address", "mac_address",
+        "platform", "platform_name", "os", "os_version", "cpu", "status", "source",
+        "first_seen", "last_seen", "cloud_provider", "manufacturer", "model",
+        "network_interfaces", "open_ports", "software", "volumes", "vulnerabilities",
+        "ec2_instance_id", "ec2_instance_type", "ec2_region", "ec2_vpc_id", "ec2_subnet_id",
+        "ec2_availability_zone", "ec2_private_ip", "ec2_public_ip", "ec2_account_id",
+        "total_memory", "device_id", "cid", "agent_version", "bios_manufacturer", "bios_version",
+        "instance_id", "service_provider", "service_provider_account_id", "kernel_version",
+        "system_manufacturer", "system_product_name", "tags", "groups", "zone_group",
+        "policies", "device_policies", "_extra",
+    )
+
+    def __init__(self, document: Dict[str, Any]):
+        for field in _FIELDS:
+            setattr(self, field, _MISSING)
+        extra = None
+        for key, value in document.items():
+            if key in SUB_RECORDS and isinstance(value, list):
+                record_type = SUB_RECORDS[key]
+                value = tuple(_compact_item(record_type, item) for item in value)
+            elif key in STRING_LIST_FIELDS and isinstance(value, list):
+                value = tuple(_intern(item) for item in value)
+            elif key in INTERNED_FIELDS:
+                value = _intern(value)
+            if key in _SLOT_NAMES:
+                setattr(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        self._extra = extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _SLOT_NAMES:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        return (self._extra or {}).get(key, default)
+
+    def to_document(self) -> Dict[str, Any]:
+        """Plain BSON-ready dict, with nested records expanded back into dicts and lists."""
+        document: Dict[str, Any] = {}
+        for field in _FIELDS:
+            value = getattr(self, field)
+            if value is _MISSING:
+                continue
+            if field in SUB_RECORDS and isinstance(value, tuple):
+                value = [item._asdict() for item in value]
+            elif field in STRING_LIST_FIELDS and isinstance(value, tuple):
+                value = list(value)
+            document[field] = value
+        if self._extra:
+            document.update(self._extra)
+        return document
+
+
+_FIELDS = tuple(field for field in CompactHost.__slots__ if field != "_extra")
+_SLOT_NAMES = frozenset(_FIELDS)
+
+
+def compact_hosts(hosts: Iterable[Dict[str, Any]]) -> List[CompactHost]:
+    return [CompactHost(host) for host in hosts]
+
+
+def as_document(host: Any) -> Dict[str, Any]:
+    """Expand a CompactHost at the persistence boundary; dicts pass through."""
+    return host.to_document() if isinstance(host, CompactHost) else host
+
+
+def as_documents(hosts: Iterable[Any]) -> List[Dict[str, Any]]:
+    return [as_document(host) for host in hosts]
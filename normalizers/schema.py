@@ -0,0 +1,276 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from deduplication.identity_index import DEFAULT_MATCH_KEYS
+from instrumentation.metrics import metrics
+from normalizers.timestamps import try_to_utc
+
+class Find(NamedTuple):
+    """Path step: the ``key`` member of the first list item that has one."""
+    key: str
+
+
+class Field(NamedTuple):
+    """Value at ``path`` in the raw host, passed through the named converter."""
+    path: Tuple[Union[str, int, Find], ...]
+    convert: Optional[str] = None
+    default: Any = None
+
+
+class First(NamedTuple):
+    """The first truthy value among several fields (``a or b``)."""
+    options: Tuple[Any, ...]
+
+
+class Each(NamedTuple):
+    """Map every item of the list at ``path`` through ``item`` (a path or a dict of paths)."""
+    path: Tuple[Union[str, int, Find], ...]
+    item: Any
+
+
+class Const(NamedTuple):
+    value: Any
+
+
+def _number_long(value: Any) -> Any:
+    """Unwrap MongoDB extended JSON ``{"$numberLong": "..."}`` values."""
+    if isinstance(value, dict) and "$numberLong" in value:
+        return int(value["$numberLong"])
+    return value
+
+
+CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "timestamp": try_to_utc,
+    "number_long": _number_long,
+}
+
+EC2 = Find("Ec2AssetSourceSimple")
+QUALYS_EC2 = ("sourceInfo", "list", EC2)
+QUALYS_INTERFACE = ("networkInterface", "list", 0, "HostAssetInterface")
+
+QUALYS_STANDARD: Dict[str, Any] = {
+    "host_id": ("agentInfo", "agentId"),
+    "hostname": First((("dnsHostName",), ("fqdn",))),
+    "external_ip": QUALYS_EC2 + ("publicIpAddress",),
+    "local_ip": ("address",),
+    "mac_address": QUALYS_INTERFACE + ("macAddress",),
+    "platform": ("agentInfo", "platform"),
+    "os_version": ("os",),
+    "cpu": ("processor", "list", 0, "HostAssetProcessor", "name"),
+    "status": ("agentInfo", "status"),
+    "first_seen": Field(("created",), "timestamp"),
+    "last_seen": Field(("agentInfo", "lastCheckedIn", "$date"), "timestamp"),
+    "tags": Each(("tags", "list"), ("TagSimple", "name")),
+    "source": Const("qualys"),
+}
+
+CROWDSTRIKE_STANDARD: Dict[str, Any] = {
+    "host_id": ("device_id",),
+    "hostname": ("hostname",),
+    "external_ip": ("external_ip",),
+    "local_ip": ("local_ip",),
+    "mac_address": ("mac_address",),
+    "platform": ("platform_name",),
+    "os_version": ("os_version",),
+    "cpu": ("cpu_signature",),
+    "status": ("status",),
+    "first_seen": Field(("first_seen",), "timestamp"),
+    "last_seen": Field(("last_seen",), "timestamp"),
+    "tags": Field(("tags",), default=[]),
+    "source": Const("crowdstrike"),
+}
+
+# The fields of backup_normalizer.py under the standard names the Deduplicator uses.
+QUALYS_EXTENDED: Dict[str, Any] = {
+    **QUALYS_STANDARD,
+    "hostname": First((("name",), ("dnsHostName",), ("fqdn",))),
+    "last_scanned": Field(("lastVulnScan", "$date"), "timestamp"),
+    "cloud_provider": ("cloudProvider",),
+    "manufacturer": ("manufacturer",),
+    "model": ("model",),
+    "network_interfaces": Each(("networkInterface", "list"), {
+        "name": ("HostAssetInterface", "interfaceName"),
+        "mac_address": ("HostAssetInterface", "macAddress"),
+        "ip_address": ("HostAssetInterface", "address"),
+    }),
+    "open_ports": Each(("openPort", "list"), {
+        "port": ("HostAssetOpenPort", "port"),
+        "protocol": ("HostAssetOpenPort", "protocol"),
+        "service": ("HostAssetOpenPort", "serviceName"),
+    }),
+    "software": Each(("software", "list"), {
+        "name": ("HostAssetSoftware", "name"),
+        "version": ("HostAssetSoftware", "version"),
+    }),
+    "ec2_instance_id": QUALYS_EC2 + ("instanceId",),
+    "ec2_instance_type": QUALYS_EC2 + ("instanceType",),
+    "ec2_region": QUALYS_EC2 + ("region",),
+    "ec2_vpc_id": QUALYS_EC2 + ("vpcId",),
+    "ec2_subnet_id": QUALYS_EC2 + ("subnetId",),
+    "ec2_availability_zone": QUALYS_EC2 + ("availabilityZone",),
+    "ec2_private_ip": QUALYS_EC2 + ("privateIpAddress",),
+    "ec2_public_ip": QUALYS_EC2 + ("publicIpAddress",),
+    "ec2_account_id": QUALYS_EC2 + ("accountId",),
+    "total_memory": ("totalMemory",),
+    "volumes": Each(("volume", "list"), {
+        "name": ("HostAssetVolume", "name"),
+        "size": Field(("HostAssetVolume", "size"), "number_long"),
+        "free": Field(("HostAssetVolume", "free"), "number_long"),
+    }),
+    "vulnerabilities": Each(("vuln", "list"), {
+        "qid": ("HostAssetVuln", "qid"),
+        "first_found": ("HostAssetVuln", "firstFound"),
+        "last_found": ("HostAssetVuln", "lastFound"),
+    }),
+}
+
+CROWDSTRIKE_EXTENDED: Dict[str, Any] = {
+    **CROWDSTRIKE_STANDARD,
+    "device_id": ("device_id",),
+    "cid": ("cid",),
+    "agent_version": ("agent_version",),
+    "bios_manufacturer": ("bios_manufacturer",),
+    "bios_version": ("bios_version",),
+    "instance_id": ("instance_id",),
+    "service_provider": ("service_provider",),
+    "service_provider_account_id": ("service_provider_account_id",),
+    "kernel_version": ("kernel_version",),
+    "system_manufacturer": ("system_manufacturer",),
+    "system_product_name": ("system_product_name",),
+    "groups": Field(("groups",), default=[]),
+    "zone_group": ("zone_group",),
+    "policies": Field(("policies",), default=[]),
+    "device_policies": Field(("device_policies",), default={}),
+}
+
+# Selectable per deployment: "standard" matches normalizer.py, "extended" covers backup_normalizer.py.
+SCHEMAS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "standard": {"qualys": QUALYS_STANDARD, "crowdstrike": CROWDSTRIKE_STANDARD},
+    "extended": {"qualys": QUALYS_EXTENDED, "crowdstrike": CROWDSTRIKE_EXTENDED},
+}
+
+# What a default Deduplicator matches and aggregates on (see Deduplicator.required_fields).
+REQUIRED_FIELDS: Tuple[str, ...] = tuple(DEFAULT_MATCH_KEYS) + ("last_seen", "os_version", "platform", "source")
+
+
+class _Compiler:
+    """Generates the source of one extractor function for a source schema.
+
+    Shared path prefixes are read once into locals, missing intermediate
+    values fall back to an empty mapping, and converters are called
+    directly, so the result reads like a hand-written normalizer.
+    """
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.prefixes: Dict[Tuple[Any, ...], str] = {(): "host"}
+
+    @staticmethod
+    def _step(expression: str, step: Any) -> str:
+        if isinstance(step, Find):
+            return f"next((item[{step.key!r}] for item in {expression} if {step.key!r} in item), _EMPTY)"
+        if isinstance(step, int):
+            return f"({expression}[{step}] if len({expression}) > {step} else _EMPTY)"
+        return f"({expression}.get({step!r}) or _EMPTY)"
+
+    def _container(self, path: Tuple[Any, ...]) -> str:
+        """Local variable holding the value at ``path``, read once per host."""
+        if path not in self.prefixes:
+            parent = self._container(path[:-1])
+            name = f"_v{len(self.prefixes)}"
+            self.lines.append(f"    {name} = {self._step(parent, path[-1])}")
+            self.prefixes[path] = name
+        return self.prefixes[path]
+
+    @staticmethod
+    def _leaf(base: str, field: Field, start: int = 0) -> str:
+        """Read ``field`` from ``base``, which already holds the value at ``field.path[:start]``."""
+        *steps, last = field.path
+        if not isinstance(last, str):
+            raise ValueError(f"Path must end with a key: {field.path}")
+        for step in steps[start:]:
+            base = _Compiler._step(base, step)
+        default = "" if field.default is None else f", {field.default!r}"
+        expression = f"{base}.get({last!r}{default})"
+        return f"_{field.convert}({expression})" if field.convert else expression
+
+    def _field(self, field: Any) -> str:
+        if isinstance(field, Const):
+            return repr(field.value)
+        if isinstance(field, First):
+            return "(" + " or ".join(self._field(option) for option in field.options) + ")"
+        if isinstance(field, Each):
+            items = self._leaf(self._container(field.path[:-1]), Field(field.path, default=()), len(field.path) - 1)
+            return f"[{self._item(field.item)} for item in {items}]"
+        if isinstance(field, tuple) and not isinstance(field, Field):
+            field = Field(field)
+        if field.convert and field.convert not in CONVERTERS:
+            raise ValueError(f"Unknown converter: {field.convert}")
+        return self._leaf(self._container(field.path[:-1]), field, len(field.path) - 1)
+
+    def _item(self, item: Any) -> str:
+        if isinstance(item, dict):
+            return "{" + ", ".join(f"{name!r}: {self._item(value)}" for name, value in item.items()) + "}"
+        field = item if isinstance(item, Field) else Field(item)
+        return self._leaf("item", field)
+
+    def compile(self, name: str, schema: Dict[str, Any]) -> str:
+        body = [f"        {target!r}: {self._field(field)}," for target, field in schema.items()]
+        return "\n".join([f"def {name}(host):", *self.lines, "    return {", *body, "    }"]) + "\n"
+
+
+def compile_source(schema: Dict[str, Any], name: str = "extract") -> str:
+    """Python source of the extractor function for one source schema."""
+    return _Compiler().compile(name, schema)
+
+
+@lru_cache(maxsize=None)
+def compile_schema(schema_name: str) -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+    """One compiled extractor per source of a registered schema, built once per process."""
+    extractors = {}
+    for source, schema in SCHEMAS[schema_name].items():
+        name = f"normalize_{source}_host"
+        namespace: Dict[str, Any] = {"_EMPTY": {}, **{f"_{key}": func for key, func in CONVERTERS.items()}}
+        exec(compile(compile_source(schema, name), f"<schema {schema_name}:{source}>", "exec"), namespace)
+        extractors[source] = namespace[name]
+    return extractors
+
+
+def validate_schema(schema_name: str, required: Iterable[str] = REQUIRED_FIELDS) -> None:
+    """Raise ValueError if a source of the schema does not produce every ``required`` field."""
+    for source, schema in SCHEMAS[schema_name].items():
+        missing = [field for field in required if field not in schema]
+        if missing:
+            raise ValueError(f"Schema {schema_name!r} for {source} is missing fields used by the Deduplicator: {missing}")
+
+
+class SchemaNormalizer:
+    """Normalizer driven by a registered field-mapping schema.
+
+    A drop-in for ``Normalizer`` (including as ``ParallelNormalizer``'s
+    ``normalizer_cls``): extractors are compiled on first use in each
+    process, and pickling sends only the schema name to workers.
+    """
+
+    def __init__(self, schema: str = "standard", required: Iterable[str] = REQUIRED_FIELDS):
+        if schema not in SCHEMAS:
+            raise ValueError(f"Unknown normalizer schema: {schema}")
+        validate_schema(schema, required)
+        self.schema = schema
+        self.required = tuple(required)
+
+    def __reduce__(self):
+        return SchemaNormalizer, (self.schema, self.required)
+
+    def normalize_host(self, host: Dict[str, Any], source: str) -> Dict[str, Any]:
+        return compile_schema(self.schema)[source](host)
+
+    def normalize_hosts(self, hosts: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
+        extractors = compile_schema(self.schema)
+        if source not in extractors:
+            raise ValueError(f"Unknown source: {source}")
+        extract = extractors[source]
+        with metrics.timer("normalize", source=source):
+            normalized_hosts = [extract(host) for host in hosts]
+        metrics.increment("normalized_hosts_total", len(normalized_hosts), source=source)
+        return normalized_hosts
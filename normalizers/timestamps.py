@@ -0,0 +1,92 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Optional
+import pytz
+
+def _parse_iso_z(text: str) -> Optional[datetime]:
+    """Fast path for ``YYYY-MM-DDTHH:MM:SS[.fraction]Z``, the format both sources use."""
+    if (
+        len(text) < 20
+        or text[-1] != "Z"
+        or text[4] != "-"
+        or text[7] != "-"
+        or text[10] not in "T "
+        or text[13] != ":"
+        or text[16] != ":"
+    ):
+        return None
+    microsecond = 0
+    if len(text) > 20:
+        if text[19] != ".":
+            return None
+        # CrowdStrike sends nanoseconds; datetime keeps microseconds.
+        digits = text[20:-1][:6]
+        if not digits.isdigit():
+            return None
+        microsecond = int(digits.ljust(6, "0"))
+    try:
+        return datetime(
+            int(text[0:4]), int(text[5:7]), int(text[8:10]),
+            int(text[11:13]), int(text[14:16]), int(text[17:19]),
+            microsecond, tzinfo=pytz.UTC,
+        )
+    except ValueError:
+        return None
+
+def _aware(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=pytz.UTC)
+    if value.tzinfo is pytz.UTC:
+        return value
+    return value.astimezone(pytz.UTC)
+
+@lru_cache(maxsize=65536)
+def parse_timestamp(text: str) -> datetime:
+    """Parse a timestamp string into a tz-aware UTC datetime, memoizing repeated values."""
+    parsed = _parse_iso_z(text)
+    if parsed is not None:
+        return parsed
+    try:
+        # Remove redundant 'Z' if there is already a timezone offset
+        if text.endswith('Z') and '+' in text:
+            text = text.rstrip('Z')
+        return _aware(datetime.fromisoformat(text.rstrip('Z')))
+    except ValueError:
+        pass
+    try:
+        return _aware(datetime.strptime(text, '%Y-%m-%d %H:%M:%S'))
+    except ValueError:
+        pass
+    try:
+        from dateutil.parser import parse as date_parse
+    except ImportError:
+        raise ValueError(f"Invalid date format: {text}")
+    try:
+        return _aware(date_parse(text))
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid date format: {text}")
+
+def to_utc(value: Any) -> Optional[datetime]:
+    """Convert a datetime, timestamp string, epoch number or Qualys ``{"$date": ...}`` to UTC."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return _aware(value)
+    if isinstance(value, str):
+        return parse_timestamp(value)
+    if isinstance(value, dict) and "$date" in value:
+        return to_utc(value["$date"])
+    if isinstance(value, dict) and "$numberLong" in value:
+        # Extended JSON dates may carry epoch milliseconds.
+        return datetime.fromtimestamp(int(value["$numberLong"]) / 1000, pytz.UTC)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, pytz.UTC)
+    raise ValueError(f"Invalid date format: {value}")
+
+def try_to_utc(value: Any) -> Optional[datetime]:
+    """Like ``to_utc`` but reports unparseable values and returns None."""
+    try:
+        return to_utc(value)
+    except ValueError:
+        print(f"Invalid date format: {value}")
+        return None
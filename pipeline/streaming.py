@@ -0,0 +1,403 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import aiohttp
+
+from deduplication.async_deduplicator import AsyncDeduplicator
+from deduplication.deduplicator import Deduplicator
+from deduplication.run_journal import RunJournal
+from deduplication.sync_state import SyncState
+
+# Marks the end of a queue for the stage reading it.
+_DONE = object()
+
+@dataclass
+class PipelineConfig:
+    """Queue depths and batch sizes for the streaming pipeline."""
+    skip: int = 0
+    page_size: int = 100
+    fetch_concurrency: int = 4
+    raw_queue_size: int = 8
+    normalized_queue_size: int = 8
+    normalize_workers: int = 1
+    normalize_processes: int = 1
+    compact_records: bool = False
+    # Name of a normalizers.schema mapping; None keeps the hand-written Normalizer.
+    normalizer_schema: Optional[str] = None
+    merge_batch_size: int = 1000
+    # Resume from per-source checkpoints and skip hosts whose content is unchanged.
+    incremental: bool = False
+
+
+class StageStats:
+    """Item counts and timings collected for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.skipped = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def start(self) -> None:
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def record(self, items: int, seconds: float) -> None:
+        self.items += items
+        self.batches += 1
+        self.busy_seconds += seconds
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Items per second over the stage's wall-clock lifetime."""
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 4),
+            "elapsed_seconds": round(self.elapsed, 4),
+            "items_per_second": round(self.throughput, 2),
+        }
+
+
+class PageTracker:
+    """Tracks which fetched pages are fully persisted, to derive resumable checkpoints.
+
+    ``next_skip`` only advances over a contiguous run of completed full pages;
+    a completed short page is the current end of the source, so the next run
+    starts by re-reading it to pick up hosts appended since.
+    """
+
+    def __init__(self, page_size: int, start_skips: Dict[str, int]):
+        self.page_size = page_size
+        self.next_skip = dict(start_skips)
+        self.max_last_seen: Dict[str, Any] = {}
+        self._completed: Dict[str, Dict[int, int]] = {source: {} for source in start_skips}
+
+    def complete(self, source: str, skip: int, page_len: int) -> None:
+        completed = self._completed[source]
+        completed[skip] = page_len
+        while self.next_skip[source] in completed:
+            page_len = completed.pop(self.next_skip[source])
+            if page_len < self.page_size:
+                break
+            self.next_skip[source] += self.page_size
+
+    def observe(self, hosts: List[Dict[str, Any]]) -> None:
+        for host in hosts:
+            last_seen = host.get("last_seen")
+            source = host.get("source")
+            if last_seen is not None and (source not in self.max_last_seen or last_seen > self.max_last_seen[source]):
+                self.max_last_seen[source] = last_seen
+
+
+class StreamingPipeline:
+    """Fetch -> normalize -> merge stages connected by bounded queues.
+
+    Each queue applies backpressure to the stage feeding it, so at most
+    ``raw_queue_size + normalized_queue_size`` pages and two merge batches are
+    held in memory regardless of fleet size. MongoDB work runs on the
+    ``AsyncDeduplicator``'s threads: one batch is written while the next is
+    fetched, normalized and collected.
+    """
+
+    def __init__(
+        self,
+        fetchers: Dict[str, Any],
+        normalizer: Any,
+        deduplicator: Deduplicator,
+        config: Optional[PipelineConfig] = None,
+        sync_state: Optional[SyncState] = None,
+        journal: Optional[RunJournal] = None,
+        writer: Optional[AsyncDeduplicator] = None,
+    ):
+        self.fetchers = fetchers
+        self.normalizer = normalizer
+        # A process pool normalizer decodes pages itself; handing it decoded dicts would mean pickling them.
+        self.raw_pages = getattr(normalizer, "pooled", False)
+        self.deduplicator = deduplicator
+        self.writer = writer or AsyncDeduplicator(deduplicator)
+        self._owns_writer = writer is None
+        self._write: Optional[asyncio.Future] = None
+        # The last page state queued on the writer thread; the thread runs writes in order,
+        # so awaiting it waits for every earlier one. The first failure is kept for run().
+        self._journal_write: Optional[asyncio.Future] = None
+        self._journal_error: Optional[BaseException] = None
+        self.config = config or PipelineConfig()
+        if self.config.incremental and sync_state is None:
+            sync_state = SyncState(deduplicator.db)
+        self.sync_state = sync_state if self.config.incremental else None
+        start_skips = {
+            source: self.sync_state.get_checkpoint(source)["next_skip"] if self.sync_state else self.config.skip
+            for source in fetchers
+        }
+        self.journal = journal
+        # {source: {skip: page length}} of pages an interrupted run already merged.
+        self.committed_pages: Dict[str, Dict[int, int]] = {source: {} for source in fetchers}
+        if journal is not None:
+            start_skips = journal.start_run(start_skips)
+        self.pages = PageTracker(self.config.page_size, start_skips)
+        if journal is not None:
+            for source in fetchers:
+                self.committed_pages[source] = journal.committed_pages(source)
+                for skip, page_len in sorted(self.committed_pages[source].items()):
+                    self.pages.complete(source, skip, page_len)
+        self.stats: Dict[str, StageStats] = {
+            name: StageStats(name) for name in ("fetch", "normalize", "merge")
+        }
+        # Sources whose fetch stopped on an error before their last page.
+        self.failed_sources: List[str] = []
+        # {source: skip} of the first short page decoded by the normalize stage, where a raw page walk ends.
+        self.short_pages: Dict[str, int] = {}
+
+    async def run(self, session: aiohttp.ClientSession) -> Dict[str, StageStats]:
+        raw_queue: asyncio.Queue = asyncio.Queue(maxsize=self.config.raw_queue_size)
+        normalized_queue: asyncio.Queue = asyncio.Queue(maxsize=self.config.normalized_queue_size)
+
+        tasks = [asyncio.ensure_future(self._fetch_stage(session, raw_queue))]
+        tasks += [
+            asyncio.ensure_future(self._normalize_stage(raw_queue, normalized_queue))
+            for _ in range(self.config.normalize_workers)
+        ]
+        tasks.append(asyncio.ensure_future(self._merge_stage(normalized_queue)))
+        try:
+            await asyncio.gather(*tasks)
+            if self._journal_write is not None:
+                await self._journal_write
+            if self._journal_error is not None:
+                raise self._journal_error
+            # A source that failed partway leaves the run open, so the next run resumes it.
+            if self.journal is not None and self.failed_sources:
+                print(f"Not finishing journaled run: fetching {', '.join(self.failed_sources)} failed")
+            elif self.journal is not None:
+                await self.writer.write(self.journal.finish_run)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            if self._write is not None:
+                tasks.append(self._write)
+            if self._journal_write is not None:
+                tasks.append(self._journal_write)
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            if self._owns_writer:
+                self.writer.close()
+        return self.stats
+
+    def _record_page(self, source: str, skip: int, page_len: int, state: str) -> None:
+        """Journal a page state on the writer thread, after the writes already submitted, without waiting."""
+        self._journal_write = asyncio.ensure_future(
+            self.writer.write(self.journal.record_page, source, skip, page_len, state)
+        )
+        self._journal_write.add_done_callback(self._journal_written)
+
+    def _journal_written(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None and self._journal_error is None:
+            self._journal_error = future.exception()
+
+    async def _fetch_source(self, session: aiohttp.ClientSession, source: str, fetcher, queue: asyncio.Queue) -> None:
+        stats = self.stats["fetch"]
+        skip = self.pages.next_skip[source]
+        committed = self.committed_pages[source]
+        raw = self.raw_pages and hasattr(fetcher, "iter_raw_pages")
+        if raw:
+            pages = fetcher.iter_raw_pages(
+                session,
+                skip=skip,
+                limit=self.config.page_size,
+                concurrency=self.config.fetch_concurrency,
+                last_skip=lambda: self.short_pages.get(source),
+            )
+        else:
+            pages = fetcher.iter_pages(
+                session,
+                skip=skip,
+                limit=self.config.page_size,
+                concurrency=self.config.fetch_concurrency,
+            )
+        try:
+            started = time.perf_counter()
+            async for page in pages:
+                # An undecoded page is counted, and checked against the journal, once the normalize stage decodes it.
+                stats.record(0 if raw else len(page), time.perf_counter() - started)
+                # A page that has grown since it was merged holds new hosts and goes through again.
+                if not raw and committed.get(skip) == len(page):
+                    stats.skipped += len(page)
+                else:
+                    if self.journal is not None and not raw:
+                        self._record_page(source, skip, len(page), "fetched")
+                    await queue.put((source, skip, page))
+                skip += self.config.page_size
+                started = time.perf_counter()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error fetching {source} hosts: {e}")
+            self.failed_sources.append(source)
+
+    async def _fetch_stage(self, session: aiohttp.ClientSession, queue: asyncio.Queue) -> None:
+        stats = self.stats["fetch"]
+        stats.start()
+        try:
+            await asyncio.gather(*[
+                self._fetch_source(session, source, fetcher, queue)
+                for source, fetcher in self.fetchers.items()
+            ])
+        finally:
+            stats.finish()
+        for _ in range(self.config.normalize_workers):
+            await queue.put(_DONE)
+
+    async def _normalize_stage(self, raw_queue: asyncio.Queue, normalized_queue: asyncio.Queue) -> None:
+        stats = self.stats["normalize"]
+        stats.start()
+        while True:
+            item = await raw_queue.get()
+            if item is _DONE:
+                break
+            source, skip, page = item
+            started = time.perf_counter()
+            if isinstance(page, bytes):
+                normalized = await self.normalizer.normalize_page_async(page, source)
+            else:
+                normalized = self.normalizer.normalize_hosts(page, source)
+            stats.record(len(normalized), time.perf_counter() - started)
+            if isinstance(page, bytes):
+                if len(normalized) < self.config.page_size:
+                    self.short_pages[source] = min(skip, self.short_pages.get(source, skip))
+                fetch_stats = self.stats["fetch"]
+                fetch_stats.items += len(normalized)
+                if self.committed_pages[source].get(skip) == len(normalized):
+                    fetch_stats.skipped += len(normalized)
+                    continue
+            if self.journal is not None:
+                self._record_page(source, skip, len(normalized), "normalized")
+            await normalized_queue.put((source, skip, len(normalized), normalized))
+        stats.finish()
+        await normalized_queue.put(_DONE)
+
+    async def _merge_stage(self, queue: asyncio.Queue) -> None:
+        stats = self.stats["merge"]
+        stats.start()
+        batch: List[Dict[str, Any]] = []
+        # [source, skip, page length, hosts of the page still waiting in ``batch``]
+        segments: List[List[Any]] = []
+        remaining_workers = self.config.normalize_workers
+        while remaining_workers:
+            item = await queue.get()
+            if item is _DONE:
+                remaining_workers -= 1
+                continue
+            source, skip, page_len, hosts = item
+            batch.extend(hosts)
+            segments.append([source, skip, page_len, len(hosts)])
+            while len(batch) >= self.config.merge_batch_size:
+                await self._flush(batch[:self.config.merge_batch_size], segments)
+                batch = batch[self.config.merge_batch_size:]
+        if batch or segments:
+            await self._flush(batch, segments)
+        if self._write is not None:
+            await self._write
+        stats.finish()
+
+    async def _flush(self, batch: List[Dict[str, Any]], segments: List[List[Any]]) -> None:
+        completed_pages = _consume_segments(segments, len(batch))
+        # One batch in flight at a time keeps writes and checkpoints in page order.
+        if self._write is not None:
+            await self._write
+        self._write = asyncio.ensure_future(self._write_batch(batch, completed_pages))
+
+    async def _write_batch(self, batch: List[Dict[str, Any]], completed_pages: List[List[Any]]) -> None:
+        started = time.perf_counter()
+        written = await self.writer.write(self._persist, batch, completed_pages)
+        stats = self.stats["merge"]
+        stats.record(len(batch), time.perf_counter() - started)
+        stats.skipped += len(batch) - written
+
+    def _persist(self, batch: List[Dict[str, Any]], completed_pages: List[List[Any]]) -> int:
+        """The blocking part of a flush, run on the writer thread; returns the hosts merged."""
+        hosts = self.sync_state.filter_changed(batch) if self.sync_state else batch
+        if hosts:
+            self.deduplicator.deduplicate_and_merge(hosts)
+        if self.journal is not None:
+            for source, skip, page_len in completed_pages:
+                self.journal.record_page(source, skip, page_len, "committed")
+        if self.sync_state:
+            self.sync_state.commit_hashes(hosts)
+            self.pages.observe(batch)
+            self._checkpoint(completed_pages)
+        return len(hosts)
+
+    def _checkpoint(self, completed_pages: List[List[Any]]) -> None:
+        sources = set()
+        for source, skip, page_len in completed_pages:
+            self.pages.complete(source, skip, page_len)
+            sources.add(source)
+        for source in sources:
+            self.sync_state.save_checkpoint(
+                source, self.pages.next_skip[source], self.pages.max_last_seen.get(source)
+            )
+
+
+def _consume_segments(segments: List[List[Any]], count: int) -> List[List[Any]]:
+    """Account ``count`` flushed hosts against the oldest pages; return pages now fully flushed."""
+    completed = []
+    while segments and (count or not segments[0][3]):
+        segment = segments[0]
+        used = min(count, segment[3])
+        segment[3] -= used
+        count -= used
+        if segment[3] == 0:
+            completed.append(segments.pop(0)[:3])
+    return completed
+
+
+def overlap(stats: Dict[str, StageStats]) -> Dict[str, float]:
+    """How much stage work ran concurrently: total busy time against the run's wall time.
+
+    ``factor`` above 1 means stages overlapped; ``hidden`` is the share of
+    busy time that did not add to the wall time.
+    """
+    started = [stage.started for stage in stats.values() if stage.started is not None]
+    finished = [stage.finished for stage in stats.values() if stage.finished is not None]
+    wall = max(finished) - min(started) if started and finished else 0.0
+    busy = sum(stage.busy_seconds for stage in stats.values())
+    return {
+        "wall_seconds": round(wall, 4),
+        "busy_seconds": round(busy, 4),
+        "factor": round(busy / wall, 2) if wall else 0.0,
+        "hidden": round(max(0.0, 1 - wall / busy), 3) if busy else 0.0,
+    }
+
+
+def format_report(stats: Dict[str, StageStats]) -> str:
+    """Render per-stage throughput as a small text table, followed by the stage overlap."""
+    lines = [f"{'stage':<10} {'items':>10} {'skipped':>8} {'batches':>8} {'busy s':>10} {'wall s':>10} {'items/s':>12}"]
+    for stage in stats.values():
+        row = stage.as_dict()
+        lines.append(
+            f"{row['stage']:<10} {row['items']:>10} {row['skipped']:>8} {row['batches']:>8} "
+            f"{row['busy_seconds']:>10.3f} {row['elapsed_seconds']:>10.3f} {row['items_per_second']:>12.1f}"
+        )
+    summary = overlap(stats)
+    lines.append(
+        f"wall {summary['wall_seconds']:.3f}s for {summary['busy_seconds']:.3f}s of stage work: "
+        f"overlap {summary['factor']:.2f}x, {summary['hidden']:.0%} of stage time hidden"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,15 @@
+from functools import partial
+
+import pytest
+
+import deduplication.deduplicator as deduplicator_module
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Point every Deduplicator at one in-memory mongomock server; yields a client on it."""
+    mongomock = pytest.importorskip("mongomock")
+    from mongomock.store import ServerStore
+    # mongomock gives each client its own data unless they share a store, unlike clients of one real server.
+    client_factory = partial(mongomock.MongoClient, _store=ServerStore())
+    monkeypatch.setattr(deduplicator_module, "MongoClient", client_factory)
+    yield client_factory("mongodb://localhost", tz_aware=True)
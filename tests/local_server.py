@@ -0,0 +1,31 @@
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+from aiohttp import web
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+@asynccontextmanager
+async def serve(handler: Handler) -> AsyncIterator[str]:
+    """Run ``handler`` for every path on a local port and yield the base URL."""
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        yield f"http://127.0.0.1:{port}/hosts"
+    finally:
+        await runner.cleanup()
+
+def paged_hosts(total: int, requested: list) -> Handler:
+    """A skip/limit hosts endpoint over ``total`` hosts, recording the requested skips."""
+    async def handler(request: web.Request) -> web.Response:
+        skip, limit = int(request.query["skip"]), int(request.query["limit"])
+        requested.append(skip)
+        hosts = [{"id": i, "hostname": f"host-{i}"} for i in range(skip, min(skip + limit, total))]
+        return web.Response(body=json.dumps(hosts).encode("utf-8"), content_type="application/json")
+    return handler
@@ -0,0 +1,49 @@
+import pytest
+
+from deduplication.deduplicator import Deduplicator
+
+MONGO_URI = "mongodb://localhost"
+
+def _hosts(deduplicator: Deduplicator) -> list:
+    return list(deduplicator.hosts_collection.find({}, {"_id": 0}))
+
+@pytest.mark.parametrize("warm_index", [False, True])
+def test_merges_hosts_chained_within_a_batch(mongo, warm_index):
+    deduplicator = Deduplicator(MONGO_URI, "dedup", warm_index=warm_index)
+    deduplicator.deduplicate_and_merge([
+        {"hostname": "web-a", "mac_address": "00:11:22:33:44:55", "source": "qualys"},
+        {"mac_address": "00-11-22-33-44-55", "local_ip": "10.0.0.9", "source": "crowdstrike"},
+        {"local_ip": "10.0.0.9", "external_ip": "54.0.0.1", "source": "crowdstrike"},
+        {"hostname": "db-a", "local_ip": "10.0.0.10", "source": "qualys"},
+    ])
+    hosts = _hosts(deduplicator)
+    assert len(hosts) == 2
+    web = next(host for host in hosts if host["_keys"].get("hostname") == ["web-a"])
+    assert web["_keys"]["local_ip"] == ["10.0.0.9"]
+    assert web["_keys"]["external_ip"] == ["54.0.0.1"]
+
+@pytest.mark.parametrize("warm_index", [False, True])
+def test_merges_across_batches_through_an_alias(mongo, warm_index):
+    deduplicator = Deduplicator(MONGO_URI, "dedup", warm_index=warm_index)
+    # One machine reported under two hostnames, tied together by its MAC address.
+    deduplicator.deduplicate_and_merge([
+        {"hostname": "web-a", "mac_address": "00:11:22:33:44:55", "source": "qualys"},
+        {"hostname": "web-b", "mac_address": "00-11-22-33-44-55", "source": "crowdstrike"},
+    ])
+    assert len(_hosts(deduplicator)) == 1
+    assert _hosts(deduplicator)[0]["_keys"]["hostname"] == ["web-a", "web-b"]
+
+    # Whichever hostname the stored document shows, a later host matching the other one joins it.
+    deduplicator.deduplicate_and_merge([{"hostname": "WEB-A", "local_ip": "10.0.0.9", "source": "qualys"}])
+    deduplicator.deduplicate_and_merge([{"hostname": "web-b", "external_ip": "54.0.0.1", "source": "crowdstrike"}])
+    hosts = _hosts(deduplicator)
+    assert len(hosts) == 1
+    assert hosts[0]["_keys"]["local_ip"] == ["10.0.0.9"]
+    assert hosts[0]["_keys"]["external_ip"] == ["54.0.0.1"]
+    assert deduplicator.reconcile() == 0
+
+def test_keeps_unrelated_hosts_apart(mongo):
+    deduplicator = Deduplicator(MONGO_URI, "dedup")
+    deduplicator.deduplicate_and_merge([{"hostname": "web-a", "source": "qualys"}])
+    deduplicator.deduplicate_and_merge([{"hostname": "web-b", "source": "crowdstrike"}])
+    assert len(_hosts(deduplicator)) == 2
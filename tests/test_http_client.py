@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from fetchers.http_client import AdaptiveLimiter, HttpClient
+from tests.local_server import serve
+
+def _failing(statuses: list, headers: dict) -> tuple:
+    """A handler answering with each of ``statuses`` in turn, then 200; and its request log."""
+    requests: list = []
+
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request.path)
+        if len(requests) <= len(statuses):
+            return web.Response(status=statuses[len(requests) - 1], headers=headers)
+        return web.Response(body=json.dumps([{"id": 1}]).encode("utf-8"), content_type="application/json")
+    return handler, requests
+
+async def _post(client: HttpClient, handler, limiter: AdaptiveLimiter):
+    async with serve(handler) as url:
+        async with client.create_session() as session:
+            return await client.post_json(session, url, {}, limiter)
+
+def test_retries_throttled_request_after_retry_after():
+    handler, requests = _failing([429], {"Retry-After": "0"})
+    limiter = AdaptiveLimiter(initial=4)
+    hosts = asyncio.run(_post(HttpClient(backoff_base=10.0), handler, limiter))
+    assert hosts == [{"id": 1}]
+    assert len(requests) == 2
+    # The 429 halved the concurrency limit.
+    assert limiter.limit == 2
+
+def test_retries_server_errors_with_backoff():
+    handler, requests = _failing([500, 503], {})
+    hosts = asyncio.run(_post(HttpClient(backoff_base=0.0), handler, AdaptiveLimiter()))
+    assert hosts == [{"id": 1}]
+    assert len(requests) == 3
+
+def test_raises_once_retries_are_exhausted():
+    handler, requests = _failing([503] * 5, {})
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        asyncio.run(_post(HttpClient(max_retries=2, backoff_base=0.0), handler, AdaptiveLimiter()))
+    assert error.value.status == 503
+    assert len(requests) == 3
+
+def test_retry_after_is_not_capped_by_backoff_max():
+    client = HttpClient(backoff_max=1.0, retry_after_max=300.0)
+    assert client._retry_after("120") == 120.0
+    assert client._retry_after("3600") == 300.0
+    assert client._retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert client._retry_after("soon") is None
@@ -0,0 +1,98 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from deduplication.deduplicator import Deduplicator
+from deduplication.run_journal import SqliteJournal
+from fetchers.synthetic_fetcher import SyntheticFetcher
+from normalizers.normalizer import Normalizer
+from pipeline.streaming import PipelineConfig, StreamingPipeline
+
+MONGO_URI = "mongodb://localhost"
+CONFIG = PipelineConfig(page_size=100, merge_batch_size=200)
+
+class CrashingDeduplicator(Deduplicator):
+    """Dies on the merge after ``crash_after`` hosts, like a process killed mid-run."""
+
+    def __init__(self, *args, crash_after: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.crash_after = crash_after
+        self.merged = 0
+
+    def deduplicate_and_merge(self, hosts, batch_size=None):
+        if self.merged >= self.crash_after:
+            raise RuntimeError("killed")
+        super().deduplicate_and_merge(hosts, batch_size)
+        self.merged += len(hosts)
+
+class FailingFetcher(SyntheticFetcher):
+    """Raises a fetch error once ``fail_at`` is reached, while ``failing`` is set."""
+
+    def __init__(self, *args, fail_at: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_at = fail_at
+        self.failing = True
+
+    async def iter_pages(self, session=None, skip=0, limit=1, concurrency=None):
+        async for page in super().iter_pages(session, skip, limit, concurrency):
+            if self.failing and skip >= self.fail_at:
+                raise aiohttp.ClientError("connection reset")
+            yield page
+            skip += limit
+
+def _run(fetcher, deduplicator: Deduplicator) -> StreamingPipeline:
+    pipeline = StreamingPipeline({fetcher.source: fetcher}, Normalizer, deduplicator, CONFIG, journal=deduplicator.journal)
+    asyncio.run(pipeline.run(None))
+    return pipeline
+
+def _stored(deduplicator: Deduplicator) -> int:
+    return deduplicator.hosts_collection.count_documents({})
+
+def test_replays_batch_written_but_not_acknowledged(mongo, tmp_path):
+    journal = str(tmp_path / "journal.sqlite")
+    deduplicator = Deduplicator(MONGO_URI, "crashed", journal=journal)
+
+    def killed(operations):
+        raise RuntimeError("killed")
+    deduplicator._execute_batch = killed
+    with pytest.raises(RuntimeError):
+        deduplicator.deduplicate_and_merge([{"hostname": "web-a", "source": "qualys"}, {"hostname": "web-b", "source": "qualys"}])
+    deduplicator.journal.close()
+    assert _stored(deduplicator) == 0
+
+    recovered = Deduplicator(MONGO_URI, "crashed", journal=journal)
+    assert _stored(recovered) == 2
+    assert recovered.journal.pending_chunks() == []
+
+def test_resumes_after_crash_without_refetching_merged_pages(mongo, tmp_path):
+    expected = _stored(_run(SyntheticFetcher("qualys", 1050), Deduplicator(MONGO_URI, "reference")).deduplicator)
+
+    journal = str(tmp_path / "journal.sqlite")
+    with pytest.raises(RuntimeError):
+        _run(SyntheticFetcher("qualys", 1050), CrashingDeduplicator(MONGO_URI, "resumed", journal=journal, crash_after=600))
+
+    resumed = StreamingPipeline(
+        {"qualys": SyntheticFetcher("qualys", 1050)}, Normalizer,
+        Deduplicator(MONGO_URI, "resumed", journal=journal), CONFIG, journal=SqliteJournal(journal),
+    )
+    assert resumed.pages.next_skip["qualys"] == 600
+    asyncio.run(resumed.run(None))
+    assert _stored(resumed.deduplicator) == expected
+
+    # The resumed run finished, so the next one starts over.
+    assert StreamingPipeline(
+        {"qualys": SyntheticFetcher("qualys", 1050)}, Normalizer,
+        Deduplicator(MONGO_URI, "resumed"), CONFIG, journal=SqliteJournal(journal),
+    ).pages.next_skip["qualys"] == 0
+
+def test_leaves_run_open_when_a_source_fails(mongo, tmp_path):
+    journal = str(tmp_path / "journal.sqlite")
+    fetcher = FailingFetcher("qualys", 1050, fail_at=300)
+    pipeline = _run(fetcher, Deduplicator(MONGO_URI, "failed", journal=journal))
+    assert pipeline.failed_sources == ["qualys"]
+
+    fetcher.failing = False
+    resumed = _run(fetcher, Deduplicator(MONGO_URI, "failed", journal=journal))
+    assert resumed.failed_sources == []
+    assert _stored(resumed.deduplicator) == 1050
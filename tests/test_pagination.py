@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from fetchers.base_fetcher import BaseFetcher
+from fetchers.http_client import HttpClient
+from tests.local_server import paged_hosts, serve
+
+class PagedFetcher(BaseFetcher):
+    source = "qualys"
+
+async def _walk_pages(total: int, limit: int, concurrency: int):
+    requested: list = []
+    async with serve(paged_hosts(total, requested)) as url:
+        fetcher = PagedFetcher("token", max_concurrency=concurrency, base_url=url)
+        async with HttpClient().create_session() as session:
+            pages = [page async for page in fetcher.iter_pages(session, skip=0, limit=limit)]
+    return pages, requested
+
+async def _walk_raw_pages(total: int, limit: int):
+    requested: list = []
+    short = {}
+    pages = []
+    async with serve(paged_hosts(total, requested)) as url:
+        fetcher = PagedFetcher("token", max_concurrency=1, base_url=url)
+        async with HttpClient().create_session() as session:
+            async for page in fetcher.iter_raw_pages(session, skip=0, limit=limit, last_skip=lambda: short.get("skip")):
+                hosts = json.loads(page)
+                if len(hosts) < limit:
+                    short["skip"] = len(pages) * limit
+                pages.append(hosts)
+    return pages, requested
+
+def test_iter_pages_stops_at_short_page():
+    pages, requested = asyncio.run(_walk_pages(total=250, limit=100, concurrency=1))
+    assert [len(page) for page in pages] == [100, 100, 50]
+    assert requested == [0, 100, 200]
+
+def test_iter_pages_stops_at_empty_page():
+    pages, requested = asyncio.run(_walk_pages(total=200, limit=100, concurrency=1))
+    assert [len(page) for page in pages] == [100, 100]
+    assert requested == [0, 100, 200]
+
+def test_iter_pages_keeps_order_with_prefetch():
+    pages, requested = asyncio.run(_walk_pages(total=1050, limit=100, concurrency=4))
+    assert [host["id"] for page in pages for host in page] == list(range(1050))
+    # At most the prefetch window is requested past the short page.
+    assert max(requested) <= 1000 + 3 * 100
+
+def test_iter_raw_pages_stops_at_reported_short_page():
+    pages, requested = asyncio.run(_walk_raw_pages(total=250, limit=100))
+    assert [len(page) for page in pages] == [100, 100, 50]
+    assert requested == [0, 100, 200]
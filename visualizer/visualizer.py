@@ -1,10 +1,76 @@
+import asyncio
+import hashlib
+import json
 import os
-import matplotlib.pyplot as plt
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from instrumentation.metrics import metrics
+
+# Bump when the drawing code changes so cached PNGs are re-rendered.
+RENDER_VERSION = 1
+
+class ChartSpec(NamedTuple):
+    """Everything needed to draw one chart; picklable so it can go to a worker process."""
+    kind: str
+    filename: str
+    labels: List[str]
+    values: List[int]
+    title: str
+    xlabel: str = ""
+    ylabel: str = ""
+
+    def digest(self) -> str:
+        payload = json.dumps([RENDER_VERSION, *self], default=str).encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _render_chart(spec: ChartSpec, path: str) -> str:
+    """Draw ``spec`` with the object-oriented Figure API on an Agg canvas.
+
+    No pyplot state is touched, so this is safe to run in threads or
+    worker processes. Matplotlib is imported here, on first use.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    if spec.kind == "bar":
+        figure = Figure(figsize=(10, 6))
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        axes.bar(spec.labels, spec.values)
+        axes.set_xlabel(spec.xlabel)
+        axes.set_ylabel(spec.ylabel)
+        for label in axes.get_xticklabels():
+            label.set_rotation(45)
+            label.set_horizontalalignment("right")
+        axes.set_title(spec.title)
+        figure.tight_layout()
+    elif spec.kind == "pie":
+        figure = Figure(figsize=(8, 6))
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        axes.pie(spec.values, labels=spec.labels, autopct="%1.1f%%", startangle=140)
+        axes.set_title(spec.title)
+        axes.axis("equal")  # Equal aspect ratio ensures that pie is drawn as a circle.
+    else:
+        raise ValueError(f"Unknown chart kind: {spec.kind}")
+    figure.savefig(path)
+    return path
+
 
 class Visualizer:
-    def __init__(self, output_dir: str = "output"):
+    """Renders distribution charts to PNG files in ``output_dir``.
+
+    Charts are drawn off the pyplot state machine, so batches passed to
+    ``render`` can be spread over ``workers`` processes. A chart whose
+    inputs hash the same as the last render of that file is skipped.
+    """
+
+    def __init__(self, output_dir: str = "output", workers: int = 1, use_cache: bool = True):
         self.output_dir = output_dir
+        self.workers = workers
+        self.use_cache = use_cache
+        self._executor: Optional[ProcessPoolExecutor] = None
         os.makedirs(self.output_dir, exist_ok=True)
 
     def _format_labels(self, labels: List[str]) -> List[str]:
@@ -15,6 +81,10 @@ class Visualizer:
         """Replace empty or invalid labels with 'Unknown'."""
         return [label if label else "Unknown" for label in labels]
 
+    def _labels(self, distribution: Dict[str, int]) -> List[str]:
+        # Clean first so None keys (hosts missing the field) do not reach len().
+        return self._format_labels([str(label) for label in self._clean_labels(list(distribution))])
+
     # def _get_unique_filename(self, filename: str) -> str:
     #     """Generate a unique filename to avoid overwriting existing files."""
     #     base, extension = os.path.splitext(filename)
@@ -25,45 +95,94 @@ class Visualizer:
     #         counter += 1
     #     return new_filename
 
-    def _setup_bar_plot(self, labels: List[str], values: List[int], title: str, xlabel: str, ylabel: str) -> None:
-        """Setup and configure a bar plot."""
-        plt.figure(figsize=(10, 6))
-        plt.bar(labels, values)
-        plt.title(title)
-        plt.xlabel(xlabel)
-        plt.ylabel(ylabel)
-        plt.xticks(rotation=45, ha="right")
-        plt.tight_layout()
-
-    def _setup_pie_chart(self, labels: List[str], sizes: List[int], title: str) -> None:
-        """Setup and configure a pie chart."""
-        plt.figure(figsize=(8, 6))
-        plt.pie(sizes, labels=labels, autopct="%1.1f%%", startangle=140)
-        plt.title(title)
-        plt.axis("equal")  # Equal aspect ratio ensures that pie is drawn as a circle.
-
-    def _save_plot(self, filename: str) -> None:
-        """Save the current plot to a file."""
-        plt.savefig(os.path.join(self.output_dir, filename))
-        plt.close()
+    def _digest_path(self, spec: ChartSpec) -> str:
+        return os.path.join(self.output_dir, f".{spec.filename}.hash")
+
+    def _is_current(self, spec: ChartSpec, digest: str) -> bool:
+        if not self.use_cache or not os.path.exists(os.path.join(self.output_dir, spec.filename)):
+            return False
+        try:
+            with open(self._digest_path(spec)) as f:
+                return f.read() == digest
+        except OSError:
+            return False
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def render(self, specs: Sequence[ChartSpec]) -> List[str]:
+        """Render the charts that changed since their last render; returns their paths."""
+        digests = {spec.filename: spec.digest() for spec in specs}
+        pending = [spec for spec in specs if not self._is_current(spec, digests[spec.filename])]
+        metrics.increment("render_cache_hits_total", len(specs) - len(pending))
+        paths = [os.path.join(self.output_dir, spec.filename) for spec in pending]
+
+        if self.workers > 1 and len(pending) > 1:
+            with metrics.timer("render_pool"):
+                list(self._get_executor().map(_render_chart, pending, paths))
+        else:
+            for spec, path in zip(pending, paths):
+                with metrics.timer("render", chart=spec.filename):
+                    _render_chart(spec, path)
+
+        for spec in pending:
+            with open(self._digest_path(spec), "w") as f:
+                f.write(digests[spec.filename])
+        return paths
+
+    async def render_async(self, specs: Sequence[ChartSpec]) -> List[str]:
+        """Like ``render`` but keeps the event loop free while charts are drawn."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.render, specs)
+
+    def os_distribution_chart(self, os_distribution: Dict[str, int]) -> ChartSpec:
+        return ChartSpec(
+            "bar", "os_distribution.png", self._labels(os_distribution), list(os_distribution.values()),
+            "Distribution of Hosts by Operating System", "Operating System", "Number of Hosts",
+        )
+
+    def host_age_distribution_chart(self, host_age_distribution: Dict[str, int]) -> ChartSpec:
+        return ChartSpec(
+            "pie", "host_age_distribution.png", self._labels(host_age_distribution),
+            list(host_age_distribution.values()), "Old Hosts vs Newly Discovered Hosts",
+        )
+
+    def cloud_provider_distribution_chart(self, cloud_provider_distribution: Dict[str, int]) -> ChartSpec:
+        return ChartSpec(
+            "bar", "cloud_provider_distribution.png", self._labels(cloud_provider_distribution),
+            list(cloud_provider_distribution.values()),
+            "Distribution of Hosts by Cloud Provider", "Cloud Provider", "Number of Hosts",
+        )
+
+    def distribution_charts(self, stats: Dict[str, Dict[str, int]]) -> List[ChartSpec]:
+        """Chart specs for the output of ``Deduplicator.get_stats``."""
+        return [
+            self.os_distribution_chart(stats["os_distribution"]),
+            self.host_age_distribution_chart(stats["host_age_distribution"]),
+            self.cloud_provider_distribution_chart(stats["cloud_provider_distribution"]),
+        ]
 
     def visualize_os_distribution(self, os_distribution: Dict[str, int]) -> None:
         """Visualize the distribution of hosts by operating system."""
-        labels = self._clean_labels(self._format_labels(list(os_distribution.keys())))
-        values = list(os_distribution.values())
-        self._setup_bar_plot(labels, values, "Distribution of Hosts by Operating System", "Operating System", "Number of Hosts")
-        self._save_plot("os_distribution.png")
+        self.render([self.os_distribution_chart(os_distribution)])
 
     def visualize_host_age_distribution(self, host_age_distribution: Dict[str, int]) -> None:
         """Visualize the distribution of host ages."""
-        labels = self._clean_labels(self._format_labels(list(host_age_distribution.keys())))
-        sizes = list(host_age_distribution.values())
-        self._setup_pie_chart(labels, sizes, "Old Hosts vs Newly Discovered Hosts")
-        self._save_plot("host_age_distribution.png")
+        self.render([self.host_age_distribution_chart(host_age_distribution)])
 
     def visualize_cloud_provider_distribution(self, cloud_provider_distribution: Dict[str, int]) -> None:
         """Visualize the distribution of hosts by cloud provider."""
-        labels = self._clean_labels(self._format_labels(list(cloud_provider_distribution.keys())))
-        values = list(cloud_provider_distribution.values())
-        self._setup_bar_plot(labels, values, "Distribution of Hosts by Cloud Provider", "Cloud Provider", "Number of Hosts")
-        self._save_plot("cloud_provider_distribution.png")
+        self.render([self.cloud_provider_distribution_chart(cloud_provider_distribution)])
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "Visualizer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()